@@ -0,0 +1,170 @@
+"""Micro-benchmarks for joi_mcp hot paths.
+
+Usage:
+    uv run python scripts/bench_mcp.py tsv
+    uv run python scripts/bench_mcp.py tsv --rows 50 500 5000 --fields name total_size
+    uv run python scripts/bench_mcp.py torznab
+    uv run python scripts/bench_mcp.py rpc
+"""
+
+import argparse
+import json
+import timeit
+from pathlib import Path
+
+import xmltodict
+import yaml
+
+from joi_mcp.jackett import TorrentDetail, TorrentSummary, _make_id, _parse_torznab_response
+from joi_mcp.query import project, to_tsv
+from joi_mcp.transmission import Torrent, _needed_fields, _rpc_fields
+
+
+def _make_torrents(n: int) -> list[Torrent]:
+    return [
+        Torrent(
+            id=i,
+            name=f"Some.Show.S01E{i:04d}.1080p.WEB-DL",
+            status="seeding" if i % 3 else "downloading",
+            progress=float(i % 101),
+            eta=None if i % 5 else i * 10,
+            total_size=i * 1_048_576,
+            comment="https://example.com/viewtopic.php?t=123",
+            error_string="",
+            download_speed=i,
+            upload_speed=i * 2,
+            file_count=i % 7,
+        )
+        for i in range(n)
+    ]
+
+
+def _legacy_tsv(items: list[Torrent], fields: list[str] | None) -> str:
+    """project() + model_dump-based to_tsv, as the tools did before the single-pass writer."""
+    rows = project(items, fields) if fields else [item.model_dump() for item in items]
+    keys = list(rows[0].keys())
+    lines = ["\t".join(keys)]
+    for row in rows:
+        lines.append("\t".join(str(row[k]) for k in keys))
+    return "\n".join(lines)
+
+
+def _time_per_row(fn, rows: int, number: int) -> float:
+    return timeit.timeit(fn, number=number) / number / rows * 1e6
+
+
+def bench_tsv(args: argparse.Namespace) -> None:
+    fields = args.fields or None
+    print(f"fields={fields}")
+    print(f"{'rows':>6}  {'legacy µs/row':>14}  {'single-pass µs/row':>19}  {'speedup':>8}")
+    for n in args.rows:
+        items = _make_torrents(n)
+        number = max(1, 20_000 // n)
+        legacy = _time_per_row(lambda: _legacy_tsv(items, fields), n, number)
+        current = _time_per_row(lambda: to_tsv(items, fields), n, number)
+        print(f"{n:>6}  {legacy:>14.2f}  {current:>19.2f}  {legacy / current:>7.1f}x")
+
+
+JACKETT_CASSETTES = Path(__file__).parent.parent / "tests/joi_mcp/cassettes/test_jackett"
+
+
+def _legacy_torznab(xml_content: bytes) -> int:
+    """xmltodict tree + validated TorrentDetail/TorrentSummary per item, as before iterparse."""
+    items = xmltodict.parse(xml_content).get("rss", {}).get("channel", {}).get("item", []) or []
+    for item in [items] if isinstance(items, dict) else items:
+        attrs = item.get("torznab:attr") or []
+        values = {a.get("@name"): a.get("@value") for a in ([attrs] if isinstance(attrs, dict) else attrs)}
+        guid = item.get("guid", "")
+        detail = TorrentDetail(
+            id=_make_id(guid if isinstance(guid, str) else guid.get("#text", "")),
+            title=item.get("title", ""),
+            link=item.get("link", ""),
+            size=int(values.get("size") or 0),
+            seeders=int(values.get("seeders") or 0),
+            leechers=int(values.get("peers") or 0),
+            infohash=values.get("infohash"),
+            magneturl=values.get("magneturl"),
+            publish_date=item.get("pubDate"),
+        )
+        TorrentSummary(id=detail.id, title=detail.title, size=detail.size, seeders=detail.seeders, leechers=detail.leechers)
+    return len(items)
+
+
+def _repeat_items(xml_content: str, times: int) -> bytes:
+    """Cassette body with its items repeated, encoded like the httpx response content the parser gets."""
+    head, rest = xml_content.split("<item>", 1)
+    items, tail = rest.rsplit("</item>", 1)
+    return (head + ("<item>" + items + "</item>") * times + tail).encode()
+
+
+def bench_torznab(args: argparse.Namespace) -> None:
+    print(f"{'cassette':<32}  {'items':>5}  {'xmltodict ms':>12}  {'iterparse ms':>12}  {'speedup':>8}")
+    for path in sorted(JACKETT_CASSETTES.glob("*.yaml")):
+        body = yaml.safe_load(path.read_text())["interactions"][0]["response"]["body"]["string"]
+        body = _repeat_items(body, args.repeat)
+        items = len(_parse_torznab_response(body))
+        legacy = timeit.timeit(lambda: _legacy_torznab(body), number=args.number) / args.number * 1000
+        current = timeit.timeit(lambda: _parse_torznab_response(body), number=args.number) / args.number * 1000
+        print(f"{path.stem.split('.')[-1]:<32}  {items:>5}  {legacy:>12.2f}  {current:>12.2f}  {legacy / current:>7.1f}x")
+
+
+TRANSMISSION_CASSETTE = (
+    Path(__file__).parent.parent / "tests/joi_mcp/cassettes/test_transmission/TestTransmissionContract.test_list_torrents.yaml"
+)
+RPC_CALLS = {
+    "default (all columns)": (None, None, None),
+    "fields=name,total_size": (["name", "total_size"], None, None),
+    "fields=name + progress filter": (["name"], "progress==`100`", None),
+    "fields=name, sort -download_speed": (["name"], None, "-download_speed"),
+    "fields=name + search(@)": (["name"], "search(@, 'show')", None),
+}
+
+
+def bench_rpc(args: argparse.Namespace) -> None:
+    """torrent-get response size per list_torrents call shape, re-encoding the recorded response."""
+    interactions = yaml.safe_load(TRANSMISSION_CASSETTE.read_text())["interactions"]
+    response = next(i["response"]["body"]["string"] for i in interactions if '"torrent-get"' in i["request"]["body"])
+    torrents = json.loads(response)["arguments"]["torrents"]
+    for t in torrents:
+        t.setdefault("file-count", len(t.get("files", [])))
+
+    def payload(rpc_fields: list[str] | None) -> int:
+        rows = torrents if rpc_fields is None else [{k: t[k] for k in rpc_fields if k in t} for t in torrents]
+        return len(json.dumps({"arguments": {"torrents": rows}, "result": "success"}))
+
+    baseline = payload(None)
+    print(f"{len(torrents)} torrents from {TRANSMISSION_CASSETTE.name}")
+    print(f"{'call':<36}  {'rpc fields':>10}  {'bytes':>9}  {'of all-fields':>13}")
+    print(f"{'all fields (before)':<36}  {len(torrents[0]):>10}  {baseline:>9}  {1:>13.1%}")
+    for name, call in RPC_CALLS.items():
+        rpc_fields = _rpc_fields(17, _needed_fields(*call))
+        size = payload(rpc_fields)
+        print(f"{name:<36}  {len(rpc_fields):>10}  {size:>9}  {size / baseline:>13.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="joi_mcp micro-benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    tsv_p = sub.add_parser("tsv", help="TSV encoding: project()+model_dump vs single-pass to_tsv")
+    tsv_p.add_argument("--rows", type=int, nargs="+", default=[50, 500, 5000])
+    tsv_p.add_argument("--fields", nargs="*", help="Projected fields (default: all)")
+
+    torznab_p = sub.add_parser("torznab", help="Torznab parsing on recorded Jackett cassettes: xmltodict vs iterparse")
+    torznab_p.add_argument("--repeat", type=int, default=1, help="Repeat each cassette's items N times")
+    torznab_p.add_argument("--number", type=int, default=20)
+
+    sub.add_parser("rpc", help="Transmission torrent-get payload size: all fields vs field-selective list_torrents")
+
+    args = parser.parse_args()
+
+    if args.command == "tsv":
+        bench_tsv(args)
+    elif args.command == "torznab":
+        bench_torznab(args)
+    elif args.command == "rpc":
+        bench_rpc(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic import computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -11,6 +12,7 @@ class Settings(BaseSettings):
 
     llm_model: str = "gpt-4o-mini"
     mcp_url: str = "http://127.0.0.1:8000"
+    mcp_transport: Literal["servers", "gateway", "in_process"] = "gateway"  # in_process: no HTTP, needs joi_mcp co-located
     langgraph_url: str = "http://localhost:2024"
     assistant_id: str = "joi_v2"
     openrouter_api_key: str | None = None
@@ -1,6 +1,8 @@
 import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
 from typing import Any, NotRequired
 
+from fastapi import FastAPI
 from langchain.agents import create_agent
 from langchain.agents.middleware import AgentState, before_agent, wrap_model_call
 from langchain_anthropic import ChatAnthropic
@@ -118,22 +120,46 @@ async def anthropic_cache_system_prompt(request: Any, handler: Any) -> Any:
 
 
 class _GraphFactory:
+    """Builds the graph once and hands it to every run for the life of the process.
+
+    MCP sessions the media tools hold (in_process transport) are entered on an exit stack that stays open across
+    runs; `aclose` closes it when the server shuts down.
+    """
+
     def __init__(self):
         self._graph = None
-        self._mcp_client = None
+        self._mem0 = None
+        self._stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
 
     async def __aenter__(self):
-        if self._graph is not None:
+        async with self._lock:
+            if self._graph is None:
+                try:
+                    self._graph = await self._build()
+                except BaseException:
+                    await self._stack.aclose()
+                    raise
             return self._graph
 
+    async def __aexit__(self, *args):
+        pass  # the graph and its sessions outlive the run
+
+    async def aclose(self):
+        async with self._lock:
+            self._graph = None
+            await self._stack.aclose()
+
+    async def _build(self):
         # Construction-time DI: initialize all deps
         langgraph = get_langgraph()  # ASGI in-process, no HTTP hop
-        mem0 = await asyncio.to_thread(Memory.from_config, settings.mem0_config)
+        if self._mem0 is None:
+            self._mem0 = await asyncio.to_thread(Memory.from_config, settings.mem0_config)
 
         task_tools = create_task_tools(langgraph, settings.assistant_id)
-        memory_tools = create_memory_tools(mem0)
+        memory_tools = create_memory_tools(self._mem0)
 
-        media_tools, self._mcp_client = await load_media_tools()
+        media_tools = await load_media_tools(self._stack)
         media_persona = settings.media_persona_path.read_text() if settings.media_persona_path.exists() else ""
         joi_persona = settings.persona_path.read_text() if settings.persona_path.exists() else ""
 
@@ -155,7 +181,7 @@ class _GraphFactory:
             "Last expression is the return value.",
         )
 
-        self._graph = create_agent(
+        graph = create_agent(
             model=get_model(),
             tools=prepare_tools([
                 delegate_media,
@@ -182,10 +208,7 @@ class _GraphFactory:
             ],
         )
         logger.info("joi agent compiled")
-        return self._graph
-
-    async def __aexit__(self, *args):
-        pass
+        return graph
 
 
 _factory = _GraphFactory()
@@ -193,3 +216,13 @@ _factory = _GraphFactory()
 
 def graph():
     return _factory
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await _factory.aclose()
+
+
+# Mounted via langgraph.json http.app; the server merges this lifespan into its own, so shutdown closes the sessions
+app = FastAPI(lifespan=lifespan)
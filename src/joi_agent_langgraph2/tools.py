@@ -1,10 +1,17 @@
 import asyncio
+import json
+import os
+from contextlib import AsyncExitStack
 from typing import Any
 
+import httpx
 from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import BaseTool
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool, load_mcp_tools
 from loguru import logger
+from mcp.types import Tool as MCPTool
+from pydantic import BaseModel, ValidationError
 
 from joi_agent_langgraph2.config import settings
 
@@ -23,6 +30,17 @@ MCP_SERVERS = {
     },
 }
 
+# One endpoint for all servers; its tools are namespaced "<server>_<tool>"
+MCP_GATEWAY = {
+    "joi": {
+        "url": f"{settings.mcp_url}/mcp/",
+        "transport": "streamable_http",
+    },
+}
+
+# Tool definitions last fetched from joi_mcp's /tools/<endpoint>, keyed by catalog URL: {"version": sha256, "tools": [...]}
+TOOLS_CACHE_PATH = settings.data_dir / "mcp_tools.json"
+
 MUTATION_TOOLS = {
     "add_torrent",
     "remove_torrent",
@@ -93,11 +111,118 @@ def prepare_tools(tools: list) -> list:
 
 
 def create_media_mcp_client() -> MultiServerMCPClient:
-    return MultiServerMCPClient(MCP_SERVERS)  # ty: ignore[invalid-argument-type]  # upstream typing
+    connections = MCP_SERVERS if settings.mcp_transport == "servers" else MCP_GATEWAY
+    return MultiServerMCPClient(connections)  # ty: ignore[invalid-argument-type]  # upstream typing
+
+
+def strip_namespaces(tools: list[BaseTool]) -> list[BaseTool]:
+    """Rename gateway tools back to their own names (transmission_add_torrent -> add_torrent).
+
+    Prompts, MUTATION_TOOLS and the interpreter refer to the plain names; calls still go out under the namespaced one.
+    """
+    for tool in tools:
+        for server in MCP_SERVERS:
+            if tool.name.startswith(f"{server}_"):
+                tool.name = tool.name.removeprefix(f"{server}_")
+                break
+    return tools
+
+
+def _catalog_url(connection: dict[str, Any]) -> str:
+    # {mcp_url}/tmdb/ -> {mcp_url}/tools/tmdb; the gateway at /mcp/ -> /tools/mcp
+    base, endpoint = connection["url"].rstrip("/").rsplit("/", 1)
+    return f"{base}/tools/{endpoint}"
+
+
+class ToolCatalog(BaseModel):
+    """joi_mcp's /tools/<endpoint> response: tool definitions and the hash they are versioned by."""
+
+    version: str
+    tools: list[MCPTool]
 
 
-async def load_media_tools() -> tuple[list[BaseTool], MultiServerMCPClient]:
-    client = create_media_mcp_client()
-    tools = await client.get_tools()
-    logger.info(f"Loaded {len(tools)} MCP media tools")
-    return tools, client
+CATALOG_ERRORS = (httpx.HTTPError, ValidationError)
+
+
+def _catalog_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(timeout=10.0)
+
+
+def _read_tools_cache() -> dict[str, ToolCatalog]:
+    """Cached catalogs by URL; a missing, unreadable or malformed file or entry is just not cached."""
+    try:
+        raw = json.loads(TOOLS_CACHE_PATH.read_text())
+    except (OSError, ValueError):
+        return {}
+    cache = {}
+    for url, entry in raw.items() if isinstance(raw, dict) else ():
+        try:
+            cache[url] = ToolCatalog.model_validate(entry)
+        except ValidationError:
+            logger.warning(f"Ignoring malformed cached tool definitions for {url}")
+    return cache
+
+
+def _write_tools_cache(cache: dict[str, ToolCatalog]) -> None:
+    """Write a temp file and rename it over the cache, so readers never see a half-written one."""
+    tmp = TOOLS_CACHE_PATH.with_name(f"{TOOLS_CACHE_PATH.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({url: c.model_dump(mode="json", by_alias=True, exclude_none=True) for url, c in cache.items()}))
+    tmp.replace(TOOLS_CACHE_PATH)
+
+
+async def _fetch_catalog(http: httpx.AsyncClient, url: str, cached: ToolCatalog | None) -> ToolCatalog:
+    """Revalidate the cached catalog by its version; only a changed tool list is downloaded."""
+    headers = {"If-None-Match": f'"{cached.version}"'} if cached else {}
+    try:
+        resp = await http.get(url, headers=headers)
+        if resp.status_code == 304 and cached:
+            return cached
+        resp.raise_for_status()
+        return ToolCatalog.model_validate_json(resp.content)
+    except CATALOG_ERRORS as e:
+        if not cached:
+            raise
+        logger.warning(f"Using cached tool definitions, {url} failed: {e}")
+        return cached
+
+
+async def _load_cached_tools(connections: dict[str, Any]) -> list[BaseTool]:
+    """Build tools from definitions cached on disk, one conditional GET per endpoint instead of an MCP session each.
+
+    Calls still open their own MCP session per call, as MultiServerMCPClient.get_tools() tools do. The cache file
+    is only rewritten when an endpoint's version changed.
+    """
+    cache = _read_tools_cache()
+    urls = {name: _catalog_url(connection) for name, connection in connections.items()}
+    async with _catalog_client() as http:
+        catalogs = await asyncio.gather(*(_fetch_catalog(http, url, cache.get(url)) for url in urls.values()))
+    fresh = dict(zip(urls.values(), catalogs, strict=True))
+    if any(url not in cache or cache[url].version != catalog.version for url, catalog in fresh.items()):
+        _write_tools_cache(cache | fresh)
+    return [
+        convert_mcp_tool_to_langchain_tool(None, tool, connection=connections[name], server_name=name)
+        for name, catalog in zip(urls, catalogs, strict=True)
+        for tool in catalog.tools
+    ]
+
+
+async def load_media_tools(stack: AsyncExitStack) -> list[BaseTool]:
+    """Media tools; sessions they hold are entered on `stack`, so the tools work until it closes."""
+    if settings.mcp_transport == "in_process":
+        from fastmcp import Client
+
+        from joi_mcp.gateway import mcp as gateway
+
+        client = await stack.enter_async_context(Client(gateway))  # one in-memory session for all calls
+        tools = await load_mcp_tools(client.session)
+    else:
+        mcp_client = create_media_mcp_client()
+        try:
+            tools = await _load_cached_tools(mcp_client.connections)
+        except CATALOG_ERRORS as e:  # no cache yet, or a joi_mcp without /tools
+            logger.warning(f"Tool catalog unavailable ({e}), listing tools over MCP")
+            tools = await mcp_client.get_tools()
+    if settings.mcp_transport != "servers":
+        tools = strip_namespaces(tools)
+    logger.info(f"Loaded {len(tools)} MCP media tools ({settings.mcp_transport})")
+    return tools
@@ -0,0 +1,176 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Protocol
+
+from pydantic import BaseModel, computed_field
+
+
+class CacheStats(BaseModel):
+    hits: int = 0
+    misses: int = 0
+    stale_hits: int = 0
+    evictions: int = 0
+
+    @computed_field
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / lookups if lookups else 0.0
+
+
+BUSY_TIMEOUT = 10.0  # seconds a worker waits for another one's write lock
+
+
+class Store(Protocol):
+    """Shared key/value backend behind a Cache; values are serialized strings stamped with their write time."""
+
+    def get(self, key: str) -> tuple[str, float] | None: ...
+
+    def set(self, key: str, value: str, stored_at: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class SqliteStore:
+    """Store on a sqlite table. WAL mode lets several worker processes share one file."""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str | Path, table: str, max_rows: int = 100_000):
+        self._table = table
+        self._max_rows = max_rows
+        self._writes = 0
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # a crash may lose the last writes, never corrupts: fine for a cache
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)")
+
+    def get(self, key: str) -> tuple[str, float] | None:
+        with self._lock:
+            return self._conn.execute(f"SELECT value, stored_at FROM {self._table} WHERE key = ?", (key,)).fetchone()
+
+    def set(self, key: str, value: str, stored_at: float) -> None:
+        with self._lock:
+            self._conn.execute(f"INSERT OR REPLACE INTO {self._table} VALUES (?, ?, ?)", (key, value, stored_at))
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._conn.execute(
+                    f"DELETE FROM {self._table} WHERE key IN (SELECT key FROM {self._table} ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self._max_rows,),
+                )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self._table}")
+
+
+class Cache[V]:
+    """In-memory LRU with optional TTL, stale window and write-through Store.
+
+    Entries younger than `ttl` are fresh; up to `ttl + stale_ttl` they are still returned by
+    lookup() as stale (stale-while-revalidate); older ones are dropped. ttl=None never expires.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float | None = None,
+        stale_ttl: float = 0.0,
+        store: Store | None = None,
+        dumps: Callable[[V], str] | None = None,
+        loads: Callable[[str], V] | None = None,
+    ):
+        if store is not None and (dumps is None or loads is None):
+            raise ValueError("dumps/loads are required with a store")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stats = CacheStats()
+        self._store = store
+        self._dumps = dumps
+        self._loads = loads
+        self._data: OrderedDict[str, tuple[V, float]] = OrderedDict()
+
+    def _entry(self, key: str) -> tuple[V, float] | None:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+            return entry
+        if self._store is None or (row := self._store.get(key)) is None:
+            return None
+        entry = (self._loads(row[0]), row[1])
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: tuple[V, float]) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def lookup(self, key: str) -> tuple[V, bool] | None:
+        """Return (value, is_fresh), or None on a miss."""
+        entry = self._entry(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if self.ttl is None or age <= self.ttl:
+                self.stats.hits += 1
+                return value, True
+            if age <= self.ttl + self.stale_ttl:
+                self.stats.stale_hits += 1
+                return value, False
+            self._data.pop(key, None)
+        self.stats.misses += 1
+        return None
+
+    def get(self, key: str) -> V | None:
+        hit = self.lookup(key)
+        return hit[0] if hit is not None and hit[1] else None
+
+    def set(self, key: str, value: V) -> None:
+        stored_at = time.time()
+        self._remember(key, (value, stored_at))
+        if self._store is not None:
+            self._store.set(key, self._dumps(value), stored_at)
+
+    def __setitem__(self, key: str, value: V) -> None:
+        self.set(key, value)
+
+    def __getitem__(self, key: str) -> V:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._entry(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+        if self._store is not None:
+            self._store.delete(key)
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self._data))
+
+    def clear(self) -> None:
+        self._data.clear()
+        if self._store is not None:
+            self._store.clear()
@@ -1,5 +1,8 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+SHARED_CACHE_PATH = "data/joi_mcp_cache.db"
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
@@ -7,13 +10,44 @@ class Settings(BaseSettings):
     # Server
     host: str = "127.0.0.1"
     port: int = 8000
+    workers: int = 1  # uvicorn worker processes; >1 shares caches through cache_path and serves MCP statelessly
+    cache_path: str | None = None  # sqlite file shared by every cache without its own path; SHARED_CACHE_PATH with workers > 1
+
+    # Upstream HTTP (shared by Jackett, TMDB and Transmission)
+    upstream_breaker_failures: int = 5  # consecutive transport errors/502-504s before an upstream fails fast
+    upstream_breaker_cooldown: float = 30.0  # seconds an open breaker fails fast before letting one probe through
 
     # Jackett
     jackett_url: str = "http://localhost:9117"
     jackett_api_key: str = ""
+    jackett_query_timeout: float = 20.0
+    jackett_max_concurrency: int = 4
+    jackett_max_connections: int = 16  # HTTP requests in flight to Jackett, per-indexer fan-out included
+    jackett_per_indexer: bool = False  # query each configured indexer separately instead of /indexers/all
+    jackett_indexer_deadline: float = 15.0  # keep below jackett_query_timeout
+    jackett_indexer_max_failures: int = 3  # consecutive failures/timeouts before an indexer is benched
+    jackett_indexer_cooldown: float = 600.0
+    jackett_search_cache_size: int = 256
+    jackett_search_ttl: float = 300.0
+    jackett_search_stale_ttl: float = 900.0  # serve stale results this much longer while refreshing in background
+    jackett_detail_cache_size: int = 5000
+    jackett_cache_path: str | None = None  # sqlite file; persists searches and jkt_ ids across restarts
+    jackett_prefetch_links: int = 0  # resolve the top N results' download links to magnets in the background; hits indexers
 
     # TMDB
     tmdb_api_key: str = ""
+    tmdb_max_concurrency: int = 8
+    tmdb_query_alt_titles: bool = False  # also fetch alt titles for the returned page of query searches
+    tmdb_max_pages: int = 10  # TMDB pages (20 results each) one discover_movies call may fetch; filter/sort see this many
+    tmdb_interleave_results: bool = False  # merge movie and TV search results by popularity instead of movies first
+    tmdb_max_retries: int = 3  # retries on 429, waiting for Retry-After
+    tmdb_cache_size: int = 2048  # in-memory entries per endpoint kind
+    tmdb_cache_path: str | None = None  # sqlite file; persists TMDB responses across restarts
+    tmdb_genre_ttl: float = 30 * 86400.0
+    tmdb_find_ttl: float = 7 * 86400.0  # IMDb id lookups
+    tmdb_details_ttl: float = 3 * 86400.0  # /movie/*, /tv/*: recommendations, similar, alternative titles
+    tmdb_discover_ttl: float = 86400.0
+    tmdb_search_ttl: float = 6 * 3600.0
 
     # Transmission
     transmission_host: str = "localhost"
@@ -22,6 +56,21 @@ class Settings(BaseSettings):
     transmission_user: str | None = None
     transmission_pass: str | None = None
     transmission_ssl: bool = False
+    transmission_max_concurrency: int = 4  # RPC calls in flight (and pooled connections)
+    transmission_mirror_max_age: float = 2.0  # serve list_torrents from the local mirror without RPC while younger
+    transmission_full_sync_interval: float = 300.0  # full torrent-get even when recently-active deltas would do
+    transmission_file_tree_cache_size: int = 64  # torrents whose list_files tree is kept between calls
+    transmission_resolve_cache_size: int = 2048  # Jackett download URL -> magnet resolutions kept for add_torrent
+    transmission_watch_interval: float = 5.0  # seconds between event-watcher diffs while /events has subscribers
+    transmission_stall_after: float = 300.0  # downloading at 0 B/s this long emits a stalled event
+    transmission_speed_threshold: int | None = None  # B/s; emit a speed event when download speed crosses it
+
+    @model_validator(mode="after")
+    def _shared_cache_for_workers(self) -> "Settings":
+        # jkt_ ids and resolved links must be visible to whichever worker serves the next call
+        if self.workers > 1 and self.cache_path is None:
+            self.cache_path = SHARED_CACHE_PATH
+        return self
 
 
 settings = Settings()
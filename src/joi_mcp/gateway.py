@@ -0,0 +1,16 @@
+from fastmcp import FastMCP
+
+from joi_mcp.jackett import mcp as jackett_mcp
+from joi_mcp.tmdb import mcp as tmdb_mcp
+from joi_mcp.transmission import mcp as transmission_mcp
+
+# Tools are exposed as "<namespace>_<tool>", e.g. transmission_add_torrent
+SERVERS: dict[str, FastMCP] = {
+    "tmdb": tmdb_mcp,
+    "transmission": transmission_mcp,
+    "jackett": jackett_mcp,
+}
+
+mcp = FastMCP("Joi")
+for namespace, server in SERVERS.items():
+    mcp.mount(server, namespace=namespace)
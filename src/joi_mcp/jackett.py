@@ -1,33 +1,34 @@
+import asyncio
 import hashlib
+import io
+import json
+import time
+import xml.etree.ElementTree as ET
+from collections.abc import Iterable
 from typing import Annotated, Literal
 
-import httpx
-import xmltodict
 from fastmcp import FastMCP
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
+from joi_mcp.cache import Cache, SqliteStore
 from joi_mcp.config import settings
-from joi_mcp.pagination import DEFAULT_LIMIT, TsvList, paginate
-from joi_mcp.query import apply_query, project, to_tsv
+from joi_mcp.links import prefetch_urls
+from joi_mcp.pagination import DEFAULT_LIMIT, TsvList
+from joi_mcp.query import query_page, to_tsv
 from joi_mcp.schema import optimize_tool_schemas
+from joi_mcp.upstream import Upstream
 
 mcp = FastMCP("Jackett")
 
-_client: httpx.Client | None = None
-_cache: dict[str, "TorrentDetail"] = {}
+_upstream = Upstream("jackett", settings.jackett_max_connections, base_url=settings.jackett_url)
+_indexers: tuple[float, list[str]] | None = None
+_indexer_stats: dict[str, "IndexerStats"] = {}
 
-
-def _get_client() -> httpx.Client:
-    global _client
-    if _client is None:
-        _client = httpx.Client(
-            base_url=settings.jackett_url,
-            timeout=30.0,
-        )
-    return _client
+INDEXER_LIST_TTL = 3600.0
 
 
 ID_PREFIX = "jkt_"
+_TORZNAB_ATTR = "{http://torznab.com/schemas/2015/feed}attr"
 
 
 def _make_id(guid: str) -> str:
@@ -61,17 +62,42 @@ class TorrentDetail(BaseModel):
 # Keep for backwards compat during transition
 TorrentResult = TorrentDetail
 
-
-def _extract_torznab_attrs(attrs: list | dict | None) -> dict:
-    """Extract torznab:attr elements into a dict."""
-    if attrs is None:
-        return {}
-    if isinstance(attrs, dict):
-        attrs = [attrs]
+_summaries = TypeAdapter(list[TorrentSummary])
+_cache_path = settings.jackett_cache_path or settings.cache_path
+_store = {table: SqliteStore(_cache_path, table) if _cache_path else None for table in ("jackett_details", "jackett_searches")}
+_cache: Cache[TorrentDetail] = Cache(
+    settings.jackett_detail_cache_size,
+    store=_store["jackett_details"],
+    dumps=TorrentDetail.model_dump_json,
+    loads=TorrentDetail.model_validate_json,
+)
+_search_cache: Cache[list[TorrentSummary]] = Cache(
+    settings.jackett_search_cache_size,
+    ttl=settings.jackett_search_ttl,
+    stale_ttl=settings.jackett_search_stale_ttl,
+    store=_store["jackett_searches"],
+    dumps=lambda items: _summaries.dump_json(items).decode(),
+    loads=_summaries.validate_json,
+)
+_refreshing: dict[str, asyncio.Task] = {}
+
+
+class IndexerStats(BaseModel):
+    requests: int = 0
+    errors: int = 0
+    consecutive_failures: int = 0
+    avg_latency: float = Field(default=0.0, description="EMA of request latency in seconds")
+    benched_until: float = Field(default=0.0, description="time.monotonic() until which the indexer is skipped")
+
+
+class TorrentSearchList(TsvList):
+    timed_out: list[str] = Field(default=[], description="Queries that hit the deadline; results may be partial")
+
+
+def _extract_torznab_attrs(attrs: Iterable[tuple[str, str]]) -> dict:
+    """Extract torznab:attr (name, value) pairs into a dict."""
     result = {}
-    for attr in attrs:
-        name = attr.get("@name", "")
-        value = attr.get("@value", "")
+    for name, value in attrs:
         if name == "seeders":
             result["seeders"] = int(value) if value else 0
         elif name == "peers":
@@ -91,83 +117,203 @@ def _extract_torznab_attrs(attrs: list | dict | None) -> dict:
     return result
 
 
-def _parse_torznab_response(xml_content: str) -> list[TorrentSummary]:
-    """Parse Torznab XML response, cache details, return summaries."""
-    data = xmltodict.parse(xml_content)
-    channel = data.get("rss", {}).get("channel", {})
-    items = channel.get("item", [])
+def _parse_item(item: ET.Element) -> TorrentSummary:
+    """Build detail (cached) + summary from one <item>. Values come straight from XML, so skip validation."""
+    attrs = _extract_torznab_attrs((a.get("name", ""), a.get("value", "")) for a in item.iter(_TORZNAB_ATTR))
+
+    # Size can come from torznab:attr or enclosure
+    size = attrs.get("size", 0)
+    if not size:
+        enclosure = item.find("enclosure")
+        if enclosure is not None:
+            size = int(enclosure.get("length") or 0)
+
+    guid = item.findtext("guid") or ""
+    short_id = _make_id(guid)
+    detail = TorrentDetail.model_construct(
+        id=short_id,
+        title=item.findtext("title") or "",
+        link=item.findtext("link") or "",
+        size=size,
+        seeders=attrs.get("seeders", 0),
+        leechers=attrs.get("leechers", 0),
+        infohash=attrs.get("infohash"),
+        magneturl=attrs.get("magneturl"),
+        category=attrs.get("category", []),
+        indexer=item.findtext("jackettindexer") or "",
+        page_url=guid,
+        publish_date=item.findtext("pubDate"),
+    )
+    _cache[short_id] = detail
+    return TorrentSummary.model_construct(
+        id=short_id,
+        title=detail.title,
+        size=detail.size,
+        seeders=detail.seeders,
+        leechers=detail.leechers,
+        indexer=detail.indexer,
+    )
+
+
+def _parse_torznab_response(xml_content: bytes) -> list[TorrentSummary]:
+    """Parse Torznab XML incrementally, cache details, return summaries. Bytes, so the declared encoding applies."""
+    summaries = []
+    for _, elem in ET.iterparse(io.BytesIO(xml_content), events=("end",)):
+        if elem.tag == "item":
+            summaries.append(_parse_item(elem))
+            elem.clear()
+    return summaries
 
-    if isinstance(items, dict):
-        items = [items]
-    if items is None:
-        items = []
 
-    summaries = []
-    for item in items:
-        attrs = _extract_torznab_attrs(item.get("torznab:attr"))
-
-        # Size can come from torznab:attr or enclosure
-        size = attrs.get("size", 0)
-        if not size:
-            enclosure = item.get("enclosure", {})
-            if isinstance(enclosure, dict):
-                size = int(enclosure.get("@length", 0) or 0)
-
-        # Get indexer from jackettindexer element or attr
-        indexer = ""
-        if "jackettindexer" in item:
-            indexer_data = item["jackettindexer"]
-            if isinstance(indexer_data, dict):
-                indexer = indexer_data.get("#text", "")
-            else:
-                indexer = str(indexer_data) if indexer_data else ""
-
-        guid = item.get("guid", "")
-        if isinstance(guid, dict):
-            guid = guid.get("#text", "")
-
-        short_id = _make_id(guid)
-
-        detail = TorrentDetail(
-            id=short_id,
-            title=item.get("title", ""),
-            link=item.get("link", ""),
-            size=size,
-            seeders=attrs.get("seeders", 0),
-            leechers=attrs.get("leechers", 0),
-            infohash=attrs.get("infohash"),
-            magneturl=attrs.get("magneturl"),
-            category=attrs.get("category", []),
-            indexer=indexer,
-            page_url=guid,
-            publish_date=item.get("pubDate"),
-        )
-        _cache[short_id] = detail
-
-        summaries.append(
-            TorrentSummary(
-                id=short_id,
-                title=detail.title,
-                size=detail.size,
-                seeders=detail.seeders,
-                leechers=detail.leechers,
-                indexer=detail.indexer,
-            )
-        )
+def _parse_indexers(xml_content: bytes) -> list[str]:
+    root = ET.fromstring(xml_content)
+    return [i.get("id", "") for i in root.iter("indexer") if i.get("configured", "true") == "true"]
 
-    return summaries
+
+async def _list_indexers() -> list[str]:
+    global _indexers
+    if _indexers is None or time.monotonic() - _indexers[0] > INDEXER_LIST_TTL:
+        params = {"t": "indexers", "configured": "true", "apikey": settings.jackett_api_key}
+        resp = await _upstream.request("GET", "/api/v2.0/indexers/all/results/torznab/api", params=params)
+        resp.raise_for_status()
+        _indexers = (time.monotonic(), _parse_indexers(resp.content))
+    return _indexers[1]
 
 
-def _search(params: dict) -> list[TorrentSummary]:
-    """Execute search against Jackett API."""
-    params["apikey"] = settings.jackett_api_key
-    resp = _get_client().get("/api/v2.0/indexers/all/results/torznab/api", params=params)
+def indexer_stats() -> dict[str, IndexerStats]:
+    return dict(_indexer_stats)
+
+
+def _record_indexer(indexer: str, latency: float, ok: bool) -> None:
+    stats = _indexer_stats.setdefault(indexer, IndexerStats())
+    stats.avg_latency = latency if stats.requests == 0 else 0.8 * stats.avg_latency + 0.2 * latency
+    stats.requests += 1
+    if ok:
+        stats.consecutive_failures = 0
+        return
+    stats.errors += 1
+    stats.consecutive_failures += 1
+    if stats.consecutive_failures >= settings.jackett_indexer_max_failures:
+        stats.benched_until = time.monotonic() + settings.jackett_indexer_cooldown
+
+
+async def _search_indexer(indexer: str, params: dict) -> list[TorrentSummary]:
+    resp = await _upstream.request(
+        "GET",
+        f"/api/v2.0/indexers/{indexer}/results/torznab/api",
+        params={**params, "apikey": settings.jackett_api_key},
+    )
     resp.raise_for_status()
-    return _parse_torznab_response(resp.text)
+    return _parse_torznab_response(resp.content)
+
+
+async def _search_per_indexer(params: dict) -> tuple[list[TorrentSummary], bool]:
+    """Query every non-benched indexer concurrently; merge as they arrive until the global deadline.
+
+    Returns the results and whether they are complete, i.e. no indexer failed or hit the deadline.
+    """
+    now = time.monotonic()
+    stats = {i: _indexer_stats.get(i, IndexerStats()) for i in await _list_indexers()}
+    # Fastest first: requests queue for upstream connections in launch order; unmeasured indexers go first to get a latency
+    indexers = sorted((i for i, s in stats.items() if s.benched_until <= now), key=lambda i: stats[i].avg_latency)
+
+    async def run(indexer: str) -> list[TorrentSummary] | None:
+        started = time.monotonic()
+        try:
+            items = await _search_indexer(indexer, params)
+        except Exception:
+            _record_indexer(indexer, time.monotonic() - started, ok=False)
+            return None
+        _record_indexer(indexer, time.monotonic() - started, ok=True)
+        return items
+
+    tasks = {indexer: asyncio.create_task(run(indexer)) for indexer in indexers}
+    seen_ids: set[str] = set()
+    results: list[TorrentSummary] = []
+    complete = True
+    try:
+        for next_done in asyncio.as_completed(tasks.values(), timeout=settings.jackett_indexer_deadline):
+            if (items := await next_done) is None:
+                complete = False
+                continue
+            for item in items:
+                if item.id not in seen_ids:
+                    seen_ids.add(item.id)
+                    results.append(item)
+    except TimeoutError:
+        complete = False
+        for indexer, task in tasks.items():
+            if not task.done():
+                _record_indexer(indexer, settings.jackett_indexer_deadline, ok=False)
+    finally:
+        for task in tasks.values():
+            task.cancel()  # also when the caller cancels us, e.g. the per-query wait_for
+    return results, complete
+
+
+async def _fetch(params: dict) -> tuple[list[TorrentSummary], bool]:
+    """Search results and whether they are complete; partial ones must not be cached."""
+    if settings.jackett_per_indexer:
+        return await _search_per_indexer(params)
+    return await _search_indexer("all", params), True
+
+
+def _search_key(params: dict) -> str:
+    normalized = {k: v for k, v in params.items() if k != "apikey"}
+    normalized["q"] = " ".join(str(normalized.get("q", "")).lower().split())
+    return json.dumps(normalized, sort_keys=True)
+
+
+async def _refresh(key: str, params: dict) -> None:
+    try:
+        items, complete = await _fetch(params)
+        if complete:
+            _search_cache[key] = items  # otherwise keep the stale entry over a partial one
+    except Exception:
+        pass  # keep serving the stale entry; next lookup retries
+    finally:
+        _refreshing.pop(key, None)
+
+
+async def _search(params: dict) -> list[TorrentSummary]:
+    """Execute search against Jackett API, served from the search cache when possible."""
+    key = _search_key(params)
+    hit = _search_cache.lookup(key)
+    # A cached search is only usable while get_torrent can still resolve its ids
+    if hit is not None and all(item.id in _cache for item in hit[0]):
+        items, fresh = hit
+        if not fresh and key not in _refreshing:
+            _refreshing[key] = asyncio.create_task(_refresh(key, params))
+        return items
+    items, complete = await _fetch(params)
+    if complete:
+        _search_cache[key] = items
+    return items
+
+
+async def _search_all(queries: list[str], base_params: dict[str, str]) -> tuple[list[list[TorrentSummary]], list[str]]:
+    """Run queries concurrently (bounded), each with its own deadline. Returns per-query results and timed-out queries."""
+    semaphore = asyncio.Semaphore(settings.jackett_max_concurrency)
+
+    async def run(q: str) -> list[TorrentSummary]:
+        async with semaphore:
+            return await asyncio.wait_for(_search({**base_params, "q": q}), settings.jackett_query_timeout)
+
+    outcomes = await asyncio.gather(*(run(q) for q in queries), return_exceptions=True)
+    results: list[list[TorrentSummary]] = []
+    timed_out: list[str] = []
+    for q, outcome in zip(queries, outcomes):
+        if isinstance(outcome, TimeoutError):
+            timed_out.append(q)
+        elif isinstance(outcome, BaseException):
+            raise outcome
+        else:
+            results.append(outcome)
+    return results, timed_out
 
 
 @mcp.tool
-def search_torrents(
+async def search_torrents(
     query: Annotated[str, Field()],
     alt_queries: Annotated[list[str] | None, Field(description="Alternative queries (OR, deduped)")] = None,
     search_type: Annotated[Literal["search", "movie", "tvsearch"], Field()] = "search",
@@ -180,7 +326,7 @@ def search_torrents(
     sort_by: Annotated[str | None, Field(description="Sort field, - prefix for desc")] = None,
     limit: Annotated[int, Field()] = DEFAULT_LIMIT,
     offset: Annotated[int, Field()] = 0,
-) -> TsvList:
+) -> TorrentSearchList:
     """Search torrents (TSV). Fields: title, size, seeders, leechers, indexer"""
     base_params: dict[str, str] = {"t": search_type}
     if year:
@@ -192,19 +338,20 @@ def search_torrents(
     if categories:
         base_params["cat"] = ",".join(str(c) for c in categories)
 
-    all_queries = [query] + (alt_queries or [])
+    per_query, timed_out = await _search_all([query] + (alt_queries or []), base_params)
     seen_ids: set[str] = set()
     results: list[TorrentSummary] = []
-    for q in all_queries:
-        for item in _search({**base_params, "q": q}):
+    for items in per_query:
+        for item in items:
             if item.id not in seen_ids:
                 seen_ids.add(item.id)
                 results.append(item)
 
-    filtered = apply_query(results, filter_expr, sort_by, limit=None)
-    paginated, total, has_more = paginate(filtered, limit, offset)
-    projected = project(paginated, fields)
-    return TsvList(data=to_tsv(projected), total=total, offset=offset, has_more=has_more)
+    paginated, total, has_more = query_page(results, filter_expr, sort_by, limit, offset)
+    if settings.jackett_prefetch_links:
+        details = [_cache[item.id] for item in paginated[: settings.jackett_prefetch_links] if item.id in _cache]
+        prefetch_urls(d.link for d in details if not d.magneturl)
+    return TorrentSearchList(data=to_tsv(paginated, fields), total=total, offset=offset, has_more=has_more, timed_out=timed_out)
 
 
 @mcp.tool
@@ -0,0 +1,68 @@
+import asyncio
+from collections.abc import Iterable
+
+import httpx
+
+from joi_mcp.cache import Cache, SqliteStore
+from joi_mcp.config import settings
+from joi_mcp.upstream import Upstream
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+_upstream = Upstream("links", settings.jackett_max_concurrency, timeout=10.0)
+# download URL -> magnet, or itself; shared through cache_path so a prefetch in one worker serves add_torrent in another
+_resolved: Cache[str] = Cache(
+    settings.transmission_resolve_cache_size,
+    store=SqliteStore(settings.cache_path, "transmission_links") if settings.cache_path else None,
+    dumps=str,
+    loads=str,
+)
+_resolving: dict[str, asyncio.Task[str]] = {}
+
+
+async def _fetch_resolved_url(url: str) -> str:
+    """One GET without following redirects; the body (a .torrent, if any) is never read."""
+    try:
+        resp = await _upstream.request("GET", url, stream=True)
+        await resp.aclose()
+    except (httpx.HTTPError, httpx.InvalidURL):
+        return url  # not cached; the next attempt retries
+    location = resp.headers.get("location", "")
+    if resp.status_code in REDIRECT_STATUSES and location.startswith("magnet:"):
+        _resolved[url] = location
+        return location
+    if resp.is_success or resp.is_redirect:
+        _resolved[url] = url
+    return url
+
+
+def _start_resolving(url: str) -> asyncio.Task[str]:
+    task = _resolving.get(url)
+    if task is None:
+        task = _resolving[url] = asyncio.create_task(_fetch_resolved_url(url))
+        task.add_done_callback(lambda _: _resolving.pop(url, None))
+    return task
+
+
+async def resolve_url(url: str) -> str:
+    """Resolve URL, following redirects to magnet links.
+
+    Jackett proxy URLs behave differently per indexer:
+    - Some return 302 redirect to magnet: link → extract magnet
+    - Some return .torrent file directly → pass URL to transmission
+
+    Transmission can handle both magnet links and torrent file URLs. Results are cached per URL, and a
+    resolution already started by prefetch_urls is awaited rather than repeated.
+    """
+    if url.startswith("magnet:"):
+        return url
+    if (resolved := _resolved.get(url)) is not None:
+        return resolved
+    return await asyncio.shield(_start_resolving(url))
+
+
+def prefetch_urls(urls: Iterable[str]) -> None:
+    """Start resolving URLs in the background so that a later add_torrent finds them cached."""
+    for url in urls:
+        if not url.startswith("magnet:") and url not in _resolved:
+            _start_resolving(url)
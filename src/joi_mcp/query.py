@@ -1,33 +1,220 @@
+import heapq
+import io
+import operator
 import re
-from typing import overload
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, overload
 
 import jmespath
 from anyascii import anyascii
 from jmespath import Options, functions
+from jmespath.parser import ParsedResult
 from pydantic import BaseModel
 
+from joi_mcp.pagination import DEFAULT_LIMIT
+
 _BARE_NUMBER = re.compile(r"(==|!=|>=|<=|>|<)\s*(\d+(?:\.\d+)?)\b(?!`)")
 _NON_ALNUM = re.compile(r"[^a-z0-9]")
+# One translate pass, so an existing backslash is escaped before it can pair with an escaped tab/newline
+_TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+FILTER_CACHE_SIZE = 256
+SEARCH_INDEX_SIZE = 50_000
 
 
+@lru_cache(maxsize=1024)
 def _normalize(text: str) -> str:
     return _NON_ALNUM.sub("", anyascii(text).lower())
 
 
+@lru_cache(maxsize=SEARCH_INDEX_SIZE)
+def _haystack(values: tuple[str, ...]) -> str:
+    """Normalized text of one row's string fields, built once per distinct row.
+
+    Normalized text is [a-z0-9] only, so the newline separator keeps matches from spanning fields.
+    """
+    return "\n".join(_NON_ALNUM.sub("", anyascii(v).lower()) for v in values)
+
+
 def _quote_numbers(expr: str) -> str:
     """Wrap bare numeric literals in JMESPath backticks so `x==100` becomes `x==`100``."""
     return _BARE_NUMBER.sub(r"\1`\2`", expr)
 
 
+def _search_object(obj: dict, needle: str) -> bool:
+    values = tuple(v for v in obj.values() if isinstance(v, str))
+    return bool(values) and _normalize(needle) in _haystack(values)
+
+
 class CustomFunctions(functions.Functions):
     @functions.signature({"types": ["object"]}, {"types": ["string"]})
     def _func_search(self, obj, needle):
         """Normalized search across all string fields (handles Cyrillic, dots, etc.)."""
-        needle_norm = _normalize(needle)
-        for v in obj.values():
-            if isinstance(v, str) and needle_norm in _normalize(v):
-                return True
+        return _search_object(obj, needle)
+
+
+_OPTIONS = Options(custom_functions=CustomFunctions())
+
+# Compiled predicates: the filter subset the tools actually use (comparisons, &&, ||, !,
+# search, contains, starts_with) turned into plain closures over a row dict. Anything
+# outside the subset, or any operand jmespath would reject, falls back to jmespath.
+
+type Predicate = Callable[[dict], Any]
+
+
+class _UnsupportedError(Exception):
+    pass
+
+
+_ORDERING = {"lt": operator.lt, "lte": operator.le, "gt": operator.gt, "gte": operator.ge}
+
+
+def _is_number(v: Any) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _is_false(v: Any) -> bool:
+    return v == "" or v == [] or v == {} or v is None or v is False
+
+
+def _equals(a: Any, b: Any) -> bool:
+    # jmespath never treats 0/1 as equal to false/true
+    if (_is_number(a) and a in (0, 1) and isinstance(b, bool)) or (_is_number(b) and b in (0, 1) and isinstance(a, bool)):
         return False
+    return a == b
+
+
+def _order(op: Callable[[Any, Any], bool], a: Any, b: Any) -> bool | None:
+    a_str, b_str = isinstance(a, str), isinstance(b, str)
+    if not ((_is_number(a) or a_str) and (_is_number(b) or b_str)):
+        return None
+    if a_str != b_str:
+        raise _UnsupportedError  # jmespath raises TypeError here; let it
+    return op(a, b)
+
+
+def _fn_search(obj: Any, needle: Any) -> bool:
+    if not isinstance(obj, dict) or not isinstance(needle, str):
+        raise _UnsupportedError
+    return _search_object(obj, needle)
+
+
+def _fn_contains(subject: Any, search: Any) -> bool:
+    if isinstance(subject, list) or (isinstance(subject, str) and isinstance(search, str)):
+        return search in subject
+    raise _UnsupportedError
+
+
+def _fn_starts_with(subject: Any, prefix: Any) -> bool:
+    if isinstance(subject, str) and isinstance(prefix, str):
+        return subject.startswith(prefix)
+    raise _UnsupportedError
+
+
+_FUNCTIONS: dict[str, Callable[[Any, Any], bool]] = {
+    "search": _fn_search,
+    "contains": _fn_contains,
+    "starts_with": _fn_starts_with,
+}
+
+
+def _field(name: str) -> Predicate:
+    def get(row: dict) -> Any:
+        v = row.get(name)
+        if isinstance(v, BaseModel):
+            raise _UnsupportedError
+        return v
+
+    return get
+
+
+def _compile_node(node: dict) -> Predicate:
+    kind = node["type"]
+    children = node.get("children", [])
+    if kind == "field":
+        return _field(node["value"])
+    if kind == "current":
+        return lambda row: row
+    if kind == "literal":
+        value = node["value"]
+        return lambda row: value
+    if kind == "not_expression":
+        inner = _compile_node(children[0])
+        return lambda row: _is_false(inner(row))
+    if kind in ("and_expression", "or_expression"):
+        left, right = _compile_node(children[0]), _compile_node(children[1])
+        if kind == "and_expression":
+            return lambda row: lv if _is_false(lv := left(row)) else right(row)
+        return lambda row: right(row) if _is_false(lv := left(row)) else lv
+    if kind == "comparator":
+        left, right = _compile_node(children[0]), _compile_node(children[1])
+        op = node["value"]
+        if op == "eq":
+            return lambda row: _equals(left(row), right(row))
+        if op == "ne":
+            return lambda row: not _equals(left(row), right(row))
+        ordering = _ORDERING[op]
+        return lambda row: _order(ordering, left(row), right(row))
+    if kind == "function_expression" and node["value"] in _FUNCTIONS and len(children) == 2:
+        fn = _FUNCTIONS[node["value"]]
+        first, second = _compile_node(children[0]), _compile_node(children[1])
+        return lambda row: fn(first(row), second(row))
+    raise _UnsupportedError
+
+
+def _compile_predicate(parsed: dict) -> Predicate | None:
+    if parsed["type"] != "filter_projection":
+        return None
+    base, rhs, condition = parsed["children"]
+    if base["type"] != "identity" or rhs["type"] != "identity":
+        return None
+    try:
+        return _compile_node(condition)
+    except _UnsupportedError:
+        return None
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _compile_filter(filter_expr: str) -> tuple[ParsedResult, Predicate | None]:
+    """Compile a (stripped) filter once; hit/miss counters via `_compile_filter.cache_info()`."""
+    expr = _quote_numbers(filter_expr)
+    parsed = jmespath.compile(expr if expr.startswith("[") else f"[?{expr}]")
+    return parsed, _compile_predicate(parsed.parsed)
+
+
+def filter_fields(filter_expr: str) -> set[str] | None:
+    """Field names a filter reads, or None when it may read the whole row (`@`, e.g. search(@, 'x'))."""
+    parsed, _ = _compile_filter(filter_expr.strip())
+    if parsed.parsed["type"] != "filter_projection":
+        return None
+    base, rhs, condition = parsed.parsed["children"]
+    if base["type"] != "identity" or rhs["type"] != "identity":
+        return None
+    fields: set[str] = set()
+    stack = [condition]
+    while stack:
+        node = stack.pop()
+        if node["type"] == "current":
+            return None
+        if node["type"] == "field":
+            fields.add(node["value"])
+        stack.extend(node.get("children", []))
+    return fields
+
+
+def _filter[T: BaseModel](items: list[T], filter_expr: str) -> list[T]:
+    parsed, predicate = _compile_filter(filter_expr.strip())
+    if predicate is not None:
+        try:
+            return [item for item in items if not _is_false(predicate(vars(item)))]
+        except _UnsupportedError:
+            pass
+
+    data = [item.model_dump() for item in items]
+    key_field = "index" if "index" in data[0] else "id"
+    key_to_item = {getattr(item, key_field): item for item in items}
+    return [key_to_item[d[key_field]] for d in parsed.search(data, options=_OPTIONS) or []]
 
 
 def apply_query[T: BaseModel](
@@ -40,25 +227,47 @@ def apply_query[T: BaseModel](
     if not items:
         return items
 
-    data = [item.model_dump() for item in items]
-    key_field = "index" if data and "index" in data[0] else "id"
-    key_to_item = {getattr(item, key_field): item for item in items}
-
     if filter_expr:
-        filter_expr = _quote_numbers(filter_expr)
-        expr = filter_expr if filter_expr.startswith("[") else f"[?{filter_expr}]"
-        opts = Options(custom_functions=CustomFunctions())
-        data = jmespath.search(expr, data, options=opts) or []
+        items = _filter(items, filter_expr)
 
     if sort_by:
         desc = sort_by.startswith("-")
         key = sort_by.lstrip("-")
-        data = sorted(data, key=lambda x: x.get(key, 0), reverse=desc)
+        items = sorted(items, key=lambda x: getattr(x, key, 0), reverse=desc)
 
     if limit and limit > 0:
-        data = data[:limit]
+        items = items[:limit]
+
+    return items
 
-    return [key_to_item[d[key_field]] for d in data]
+
+def query_page[T: BaseModel](
+    items: list[T],
+    filter_expr: str | None = None,
+    sort_by: str | None = None,
+    limit: int = DEFAULT_LIMIT,
+    offset: int = 0,
+) -> tuple[list[T], int, bool]:
+    """Filter, then sort only as far as the requested page. Returns (page, total, has_more) like paginate()."""
+    if filter_expr and items:
+        items = _filter(items, filter_expr)
+    total = len(items)
+    end = offset + limit
+
+    if sort_by and items:
+        desc = sort_by.startswith("-")
+        key = sort_by.lstrip("-")
+
+        def sort_key(x: T) -> Any:
+            return getattr(x, key, 0)
+
+        if end < total:
+            # top-k is stable, same order as sorted()[:end]
+            items = heapq.nlargest(end, items, key=sort_key) if desc else heapq.nsmallest(end, items, key=sort_key)
+        else:
+            items = sorted(items, key=sort_key, reverse=desc)
+
+    return items[offset:end], total, end < total
 
 
 @overload
@@ -82,19 +291,29 @@ def project[T: BaseModel](
     return [item.model_dump(include=include) for item in items]
 
 
-def _tsv_from_rows(keys: list[str], rows: list[dict]) -> str:
-    lines = ['\t'.join(keys)]
-    for row in rows:
-        lines.append('\t'.join(str(row[k]) for k in keys))
-    return '\n'.join(lines)
+def _tsv_line(values: tuple, tabs: int) -> str:
+    line = "\t".join(map(str, values))
+    if line.count("\t") != tabs or "\n" in line or "\r" in line or "\\" in line:
+        line = "\t".join([str(v).translate(_TSV_ESCAPES) for v in values])
+    return line
 
 
-def to_tsv(items: list[BaseModel] | list[dict]) -> str:
+def to_tsv(items: Sequence[BaseModel] | Sequence[dict[str, Any]], fields: list[str] | None = None) -> str:
+    """Single-pass TSV. For models, reads only the projected attributes (id/index auto-incl.)."""
     if not items:
         return ""
     first = items[0]
-    if isinstance(first, BaseModel):
-        keys = list(first.model_fields.keys())
-        return _tsv_from_rows(keys, [item.model_dump() for item in items])  # type: ignore[union-attr]
-    keys = list(first.keys())
-    return _tsv_from_rows(keys, items)  # type: ignore[arg-type]
+    keys = list(first.keys()) if isinstance(first, dict) else list(type(first).model_fields)
+    if fields and isinstance(first, BaseModel):
+        include = set(fields) | {"index" if "index" in keys else "id"}
+        keys = [k for k in keys if k in include]
+
+    getter = itemgetter(*keys)
+    tabs = len(keys) - 1
+    out = io.StringIO()
+    out.write("\t".join(keys))
+    for item in items:
+        values = getter(item if isinstance(item, dict) else vars(item))
+        out.write("\n")
+        out.write(_tsv_line(values if tabs else (values,), tabs))
+    return out.getvalue()
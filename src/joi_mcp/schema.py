@@ -1,7 +1,10 @@
+import hashlib
+import json
 from typing import Any
 
 from fastmcp import FastMCP
 from fastmcp.tools import Tool
+from pydantic import BaseModel, Field
 
 
 def strip_nullable_anyof(schema: dict[str, Any]) -> dict[str, Any]:
@@ -29,3 +32,22 @@ def optimize_tool_schemas(mcp: FastMCP) -> None:
     for component in provider._components.values():
         if isinstance(component, Tool):
             component.parameters = strip_nullable_anyof(component.parameters)
+
+
+class ToolCatalog(BaseModel):
+    """A server's tool definitions exactly as tools/list returns them, with a content hash clients can cache by."""
+
+    version: str = Field(description="sha256 of the canonical tools JSON; changes whenever any name, description or schema does")
+    tools: list[dict[str, Any]]
+
+
+_catalogs: dict[FastMCP, ToolCatalog] = {}
+
+
+async def tool_catalog(mcp: FastMCP) -> ToolCatalog:
+    """Serialize and hash a server's tools on first use. Tools are registered (and optimized) at import, so this never goes stale."""
+    if (catalog := _catalogs.get(mcp)) is None:
+        tools = [tool.to_mcp_tool().model_dump(mode="json", by_alias=True, exclude_none=True) for tool in await mcp.list_tools()]
+        canonical = json.dumps(tools, sort_keys=True, separators=(",", ":"))
+        catalog = _catalogs[mcp] = ToolCatalog(version=hashlib.sha256(canonical.encode()).hexdigest(), tools=tools)
+    return catalog
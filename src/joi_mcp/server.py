@@ -1,28 +1,39 @@
-from contextlib import asynccontextmanager
+import os
+from contextlib import AsyncExitStack, asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
-from joi_mcp.jackett import mcp as jackett_mcp
-from joi_mcp.tmdb import mcp as tmdb_mcp
-from joi_mcp.transmission import mcp as transmission_mcp
+from joi_mcp.config import settings
+from joi_mcp.gateway import SERVERS
+from joi_mcp.gateway import mcp as gateway_mcp
+from joi_mcp.jackett import indexer_stats as jackett_indexer_stats
+from joi_mcp.schema import ToolCatalog, tool_catalog
+from joi_mcp.tmdb import cache_stats as tmdb_cache_stats
+from joi_mcp.transmission import torrent_events
+from joi_mcp.upstream import upstream_stats
 
-jackett_app = jackett_mcp.http_app(path="/")
-tmdb_app = tmdb_mcp.http_app(path="/")
-transmission_app = transmission_mcp.http_app(path="/")
+SSE_HEARTBEAT = 15.0
+
+# /mcp serves every tool from one session (namespaced); /<server> keeps the per-server endpoints for older clients.
+# With several workers each request may land on a different process, so no MCP session state is kept between requests.
+_stateless = settings.workers > 1
+mcp_apps = {"mcp": gateway_mcp.http_app(path="/", stateless_http=_stateless)} | {
+    name: server.http_app(path="/", stateless_http=_stateless) for name, server in SERVERS.items()
+}
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with jackett_app.lifespan(jackett_app):
-        async with tmdb_app.lifespan(tmdb_app):
-            async with transmission_app.lifespan(transmission_app):
-                yield
+    async with AsyncExitStack() as stack:
+        for mcp_app in mcp_apps.values():
+            await stack.enter_async_context(mcp_app.lifespan(mcp_app))
+        yield
 
 
 app = FastAPI(title="Joi MCP", lifespan=lifespan)
-app.mount("/jackett", jackett_app)
-app.mount("/tmdb", tmdb_app)
-app.mount("/transmission", transmission_app)
+for name, mcp_app in mcp_apps.items():
+    app.mount(f"/{name}", mcp_app)
 
 
 @app.get("/")
@@ -30,9 +41,43 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/stats")
+async def stats():
+    # Per worker: counters live in the process that answers
+    return {
+        "worker": os.getpid(),
+        "tmdb_cache": tmdb_cache_stats(),
+        "upstreams": upstream_stats(),
+        "jackett_indexers": jackett_indexer_stats(),
+    }
+
+
+@app.get("/tools/{name}", response_model=ToolCatalog, responses={304: {"description": "Unchanged since If-None-Match"}})
+async def tools(name: str, request: Request):
+    """Tool definitions of the /<name> MCP endpoint, with an ETag; clients revalidate instead of opening a session."""
+    server = gateway_mcp if name == "mcp" else SERVERS.get(name)
+    if server is None:
+        raise HTTPException(404, f"Unknown MCP endpoint: {name}")
+    catalog = await tool_catalog(server)
+    headers = {"ETag": f'"{catalog.version}"', "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(catalog.model_dump_json(), media_type="application/json", headers=headers)
+
+
+@app.get("/events")
+async def events():
+    """Transmission torrent events (added, completed, stalled, errored, speed) as server-sent events."""
+
+    async def stream():
+        async for event in torrent_events(heartbeat=SSE_HEARTBEAT):
+            yield ": keepalive\n\n" if event is None else f"event: {event.type}\ndata: {event.model_dump_json()}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
 if __name__ == "__main__":
     import uvicorn
 
-    from joi_mcp.config import settings
-
-    uvicorn.run(app, host=settings.host, port=settings.port)
+    # Workers import the app by name, each building its own HTTP clients and caches in its own process
+    uvicorn.run("joi_mcp.server:app", host=settings.host, port=settings.port, workers=settings.workers)
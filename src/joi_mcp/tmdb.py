@@ -1,17 +1,128 @@
+import asyncio
+import heapq
+import json
+import time
+from itertools import chain
 from typing import Annotated, Any, Literal
+from urllib.parse import urlencode
 
-import tmdbsimple as tmdb
+import httpx
 from fastmcp import FastMCP
 from pydantic import BaseModel, Field
 
+from joi_mcp.cache import Cache, CacheStats, SqliteStore
 from joi_mcp.config import settings
-from joi_mcp.pagination import DEFAULT_LIMIT, paginate
-from joi_mcp.query import apply_query, project
+from joi_mcp.pagination import DEFAULT_LIMIT
+from joi_mcp.query import project, query_page
 from joi_mcp.schema import optimize_tool_schemas
+from joi_mcp.upstream import Upstream
 
 mcp = FastMCP("TMDB")
-if not tmdb.API_KEY:
-    tmdb.API_KEY = settings.tmdb_api_key
+
+TMDB_URL = "https://api.themoviedb.org/3"
+MAX_RETRY_AFTER = 30.0
+PAGE_SIZE = 20  # fixed by TMDB for paged endpoints
+MAX_PAGE = 500  # TMDB rejects higher pages
+
+_upstream = Upstream(
+    "tmdb",
+    settings.tmdb_max_concurrency,
+    base_url=TMDB_URL,
+    http2=True,
+    headers={"Accept": "application/json"},
+)
+_retry_at = 0.0  # monotonic time before which requests wait, set by the last 429
+
+# Responses are cached per endpoint kind, each with its own tmdb_<kind>_ttl
+_ENDPOINTS = ("genre", "find", "details", "discover", "search")
+_cache_path = settings.tmdb_cache_path or settings.cache_path
+_store = {kind: SqliteStore(_cache_path, f"tmdb_{kind}") if _cache_path else None for kind in _ENDPOINTS}
+_prefetching: dict[str, asyncio.Task] = {}
+_caches: dict[str, Cache[dict[str, Any]]] = {
+    kind: Cache(
+        settings.tmdb_cache_size,
+        ttl=getattr(settings, f"tmdb_{kind}_ttl"),
+        store=_store[kind],
+        dumps=json.dumps,
+        loads=json.loads,
+    )
+    for kind in _ENDPOINTS
+}
+
+
+def _retry_after(resp: httpx.Response, attempt: int) -> float:
+    try:
+        delay = float(resp.headers.get("Retry-After", ""))
+    except ValueError:
+        delay = 2.0**attempt
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+
+async def _request(path: str, params: dict[str, Any]) -> dict[str, Any]:
+    """GET a TMDB endpoint; on 429 every caller backs off until Retry-After, up to tmdb_max_retries times."""
+    global _retry_at
+    query = {"api_key": settings.tmdb_api_key} | params
+    for attempt in range(settings.tmdb_max_retries + 1):
+        if (wait := _retry_at - time.monotonic()) > 0:
+            await asyncio.sleep(wait)
+        resp = await _upstream.request("GET", path, params=query)
+        if resp.status_code != 429 or attempt == settings.tmdb_max_retries:
+            break
+        _retry_at = max(_retry_at, time.monotonic() + _retry_after(resp, attempt))
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _endpoint(path: str) -> str:
+    kind = path.strip("/").split("/", 1)[0]
+    return kind if kind in _ENDPOINTS else "details"
+
+
+def _cache_key(path: str, params: dict[str, Any]) -> str:
+    return f"{path}?{urlencode(sorted(params.items()))}"
+
+
+async def _get(path: str, **params: Any) -> dict[str, Any]:
+    params = {k: v for k, v in params.items() if v is not None}
+    cache = _caches[_endpoint(path)]
+    key = _cache_key(path, params)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    data = await _request(path, params)
+    cache[key] = data
+    return data
+
+
+async def _prefetch(key: str, path: str, params: dict[str, Any]) -> None:
+    try:
+        await _get(path, **params)
+    except Exception:
+        pass  # only a prefetch; a real request for the page retries
+    finally:
+        _prefetching.pop(key, None)
+
+
+async def _get_pages(path: str, first: int, last: int, prefetch: bool = True, **params: Any) -> tuple[list[dict[str, Any]], int, int]:
+    """Fetch pages first..last concurrently and, unless prefetch=False, start prefetching the one after.
+
+    Returns (results, total_results, total_pages) as reported by TMDB.
+    """
+    if last < first:
+        return [], 0, 0
+    pages = await asyncio.gather(*(_get(path, page=page, **params) for page in range(first, last + 1)))
+    total_results = pages[0].get("total_results", 0)
+    total_pages = min(pages[0].get("total_pages", 0), MAX_PAGE)
+    if prefetch and last < total_pages:
+        next_params = params | {"page": last + 1}
+        key = _cache_key(path, next_params)
+        if key not in _caches[_endpoint(path)] and key not in _prefetching:
+            _prefetching[key] = asyncio.create_task(_prefetch(key, path, next_params))
+    return [r for page in pages for r in page.get("results", [])], total_results, total_pages
+
+
+def cache_stats() -> dict[str, CacheStats]:
+    return {kind: cache.stats for kind, cache in _caches.items()}
 
 
 class Movie(BaseModel):
@@ -123,16 +234,42 @@ def _tv_to_media(t: TvShow, alt_titles: dict[str, str] | None = None) -> MediaIt
     )
 
 
-def _fetch_alt_titles(media_type: str, tmdb_id: int) -> dict[str, str]:
+async def _fetch_alt_titles(media_type: str, tmdb_id: int) -> dict[str, str]:
     if media_type == "movie":
-        raw = tmdb.Movies(tmdb_id).alternative_titles().get("titles", [])
+        raw = (await _get(f"/movie/{tmdb_id}/alternative_titles")).get("titles", [])
     else:
-        raw = tmdb.TV(tmdb_id).alternative_titles().get("results", [])
+        raw = (await _get(f"/tv/{tmdb_id}/alternative_titles")).get("results", [])
     return {e.get("iso_3166_1", ""): e.get("title", "") for e in raw}
 
 
+async def _with_alt_titles(items: list[MediaItem]) -> list[MediaItem]:
+    """Fetch alt titles for all items concurrently (bounded by tmdb_max_concurrency)."""
+    titles = await asyncio.gather(*(_fetch_alt_titles(i.media_type, i.id) for i in items))
+    return [item.model_copy(update={"alt_titles": alt}) for item, alt in zip(items, titles)]
+
+
+async def _search_movies(query: str, year: int | None) -> list[MediaItem]:
+    movies = (await _get("/search/movie", query=query, year=year)).get("results", [])
+    return [_movie_to_media(Movie.model_validate(m)) for m in movies]
+
+
+async def _search_tv(query: str) -> list[MediaItem]:
+    tv_shows = (await _get("/search/tv", query=query))["results"]
+    return [_tv_to_media(TvShow.model_validate(t)) for t in tv_shows]
+
+
+def _merge(*results: list[MediaItem]) -> list[MediaItem]:
+    """Concatenate in argument order, or with tmdb_interleave_results merge the (relevance-ordered) lists by popularity.
+
+    Both are deterministic: the interleave keeps each list's own order and breaks ties by argument order.
+    """
+    if settings.tmdb_interleave_results:
+        return list(heapq.merge(*results, key=lambda item: -item.popularity))
+    return list(chain.from_iterable(results))
+
+
 @mcp.tool
-def search_media(
+async def search_media(
     query: Annotated[str | None, Field()] = None,
     imdb_id: Annotated[str | None, Field(description="IMDB ID (tt0111161)")] = None,
     media_type: Annotated[Literal["movie", "tv"] | None, Field()] = None,
@@ -147,78 +284,92 @@ def search_media(
     if not query and not imdb_id:
         raise ValueError("Provide query or imdb_id")
 
-    items: list[MediaItem] = []
-
     if imdb_id:
-        result = tmdb.Find(imdb_id).info(external_source="imdb_id")
-        for m in result.get("movie_results", []):
-            movie = Movie.model_validate(m)
-            alt = _fetch_alt_titles("movie", movie.id)
-            items.append(_movie_to_media(movie, alt))
-        for t in result.get("tv_results", []):
-            tv = TvShow.model_validate(t)
-            alt = _fetch_alt_titles("tv", tv.id)
-            items.append(_tv_to_media(tv, alt))
+        result = await _get(f"/find/{imdb_id}", external_source="imdb_id")
+        items = _merge(
+            [_movie_to_media(Movie.model_validate(m)) for m in result.get("movie_results", [])],
+            [_tv_to_media(TvShow.model_validate(t)) for t in result.get("tv_results", [])],
+        )
+        items = await _with_alt_titles(items)
     else:
         assert query is not None
-        search = tmdb.Search()
+        searches = []
         if media_type != "tv":
-            movies = search.movie(query=query, year=year).get("results", [])
-            items.extend(_movie_to_media(Movie.model_validate(m)) for m in movies)
+            searches.append(_search_movies(query, year))
         if media_type != "movie":
-            tv_shows = search.tv(query=query)["results"]
-            items.extend(_tv_to_media(TvShow.model_validate(t)) for t in tv_shows)
+            searches.append(_search_tv(query))
+        items = _merge(*await asyncio.gather(*searches))
 
-    filtered = apply_query(items, filter_expr, sort_by, limit=None)
-    paginated, total, has_more = paginate(filtered, limit, offset)
+    paginated, total, has_more = query_page(items, filter_expr, sort_by, limit, offset)
+    if not imdb_id and settings.tmdb_query_alt_titles:
+        paginated = await _with_alt_titles(paginated)
     projected = project(paginated, fields)
     return MediaList(results=projected, total=total, offset=offset, has_more=has_more)
 
 
 @mcp.tool
-def discover_movies(
-    source: Annotated[Literal["recommendations", "similar", "genre"], Field(
-        description="Source: recommendations/similar (movie_id) or genre (genre_id)"
-    )],
+async def discover_movies(
+    source: Annotated[
+        Literal["recommendations", "similar", "genre"], Field(description="Source: recommendations/similar (movie_id) or genre (genre_id)")
+    ],
     movie_id: Annotated[int | None, Field(description="TMDB movie ID")] = None,
     genre_id: Annotated[int | None, Field(description="TMDB genre ID")] = None,
-    page: Annotated[int, Field()] = 1,
-    filter_expr: Annotated[str | None, Field(description="JMESPath filter; search(@, 'text') for text search")] = None,
+    filter_expr: Annotated[
+        str | None, Field(description="JMESPath filter over the top 200 results; search(@, 'text') for text search")
+    ] = None,
     fields: Annotated[list[str] | None, Field(description="Fields (id auto-incl.)")] = None,
-    sort_by: Annotated[str | None, Field(description="Sort field, - prefix for desc")] = None,
+    sort_by: Annotated[str | None, Field(description="Sort field, - prefix for desc; ranks the top 200 results")] = None,
     limit: Annotated[int, Field()] = DEFAULT_LIMIT,
     offset: Annotated[int, Field()] = 0,
 ) -> MovieList:
     """Discover movies by recommendations, similarity, or genre. Fields: title, overview, release_date, vote_average, genre_ids"""
+    params: dict[str, Any] = {}
     if source in ("recommendations", "similar"):
         if movie_id is None:
             raise ValueError(f"movie_id required for source={source}")
-        movie = tmdb.Movies(movie_id)
-        raw = movie.recommendations()["results"] if source == "recommendations" else movie.similar_movies()["results"]
+        endpoint = "recommendations" if source == "recommendations" else "similar_movies"
+        path = f"/movie/{movie_id}/{endpoint}"
     else:
         if genre_id is None:
             raise ValueError("genre_id required for source=genre")
-        raw = tmdb.Discover().movie(with_genres=genre_id, page=page)["results"]
-
+        path = "/discover/movie"
+        params["with_genres"] = genre_id
+
+    windowed = filter_expr is None and sort_by is None
+    if windowed:
+        # Unfiltered windows map straight onto TMDB pages
+        first = offset // PAGE_SIZE + 1
+        last = min(max(offset + limit - 1, offset) // PAGE_SIZE + 1, first + settings.tmdb_max_pages - 1, MAX_PAGE)
+        raw, total_results, total_pages = await _get_pages(path, first, last, **params)
+    else:
+        # Filter/sort need every page, up to tmdb_max_pages; page 1 tells how many there are
+        raw, total_results, total_pages = await _get_pages(path, 1, 1, prefetch=False, **params)
+        last = min(total_pages, settings.tmdb_max_pages)
+        raw += (await _get_pages(path, 2, last, **params))[0]
     movies = [Movie.model_validate(m) for m in raw]
-    filtered = apply_query(movies, filter_expr, sort_by, limit=None)
-    paginated, total, has_more = paginate(filtered, limit, offset)
+
+    if windowed:
+        skip = offset - (first - 1) * PAGE_SIZE
+        paginated = movies[skip : skip + limit]
+        total = total_results
+        has_more = offset + len(paginated) < total
+    else:
+        paginated, total, has_more = query_page(movies, filter_expr, sort_by, limit, offset)
+        has_more = has_more or last < total_pages
     projected = project(paginated, fields)
     return MovieList(movies=projected, total=total, offset=offset, has_more=has_more)
 
 
 @mcp.tool
-def list_genres(
+async def list_genres(
     filter_expr: Annotated[str | None, Field(description="JMESPath filter; search(@, 'text') for text search")] = None,
     fields: Annotated[list[str] | None, Field(description="Fields (id auto-incl.)")] = None,
     sort_by: Annotated[str | None, Field(description="Sort field, - prefix for desc")] = None,
     limit: Annotated[int, Field()] = DEFAULT_LIMIT,
 ) -> GenreList:
     """List movie genres. Fields: name"""
-    genres_api = tmdb.Genres()
-    genres = [Genre.model_validate(g) for g in genres_api.movie_list()["genres"]]
-    filtered = apply_query(genres, filter_expr, sort_by, limit=None)
-    paginated, total, has_more = paginate(filtered, limit, 0)
+    genres = [Genre.model_validate(g) for g in (await _get("/genre/movie/list"))["genres"]]
+    paginated, total, has_more = query_page(genres, filter_expr, sort_by, limit, 0)
     projected = project(paginated, fields)
     return GenreList(genres=projected, total=total, offset=0, has_more=has_more)
 
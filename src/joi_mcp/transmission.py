@@ -1,33 +1,73 @@
+import asyncio
+import time
+from collections.abc import AsyncGenerator, Callable, Collection, Iterable
 from typing import Annotated, Any, Literal
 
 import httpx
 from fastmcp import FastMCP
-from pydantic import BaseModel, Field
-from transmission_rpc import Client
+from loguru import logger
+from pydantic import BaseModel, Field, PrivateAttr
+from transmission_rpc import Torrent as RpcTorrent
+from transmission_rpc.error import TransmissionError
 
+from joi_mcp.cache import Cache
 from joi_mcp.config import settings
-from joi_mcp.pagination import DEFAULT_LIMIT, TsvList, paginate
-from joi_mcp.query import apply_query, project, to_tsv
+from joi_mcp.links import resolve_url
+from joi_mcp.pagination import DEFAULT_LIMIT, TsvList
+from joi_mcp.query import filter_fields, project, query_page, to_tsv
 from joi_mcp.schema import optimize_tool_schemas
+from joi_mcp.upstream import Upstream
 
 mcp = FastMCP("Transmission")
 
-_client: Client | None = None
-
-
-def get_client() -> Client:
-    global _client
-    if _client is None:
-        protocol = "https" if settings.transmission_ssl else "http"
-        _client = Client(
-            protocol=protocol,
-            host=settings.transmission_host,
-            port=settings.transmission_port,
-            path=settings.transmission_path,
-            username=settings.transmission_user,
-            password=settings.transmission_pass,
-        )
-    return _client
+SESSION_HEADER = "X-Transmission-Session-Id"
+# Transmission reports torrents changed within the last 60s as recently-active; stay clear of the edge
+RECENTLY_ACTIVE_WINDOW = 50.0
+WATCH_MAX_BACKOFF = 300.0  # cap on the watcher retry delay after unexpected errors
+EVENT_QUEUE_SIZE = 256  # per subscriber; the oldest events are dropped when a consumer falls behind
+
+_protocol = "https" if settings.transmission_ssl else "http"
+_upstream = Upstream(
+    "transmission",
+    settings.transmission_max_concurrency,
+    base_url=f"{_protocol}://{settings.transmission_host}:{settings.transmission_port}",
+    auth=(settings.transmission_user, settings.transmission_pass or "") if settings.transmission_user else None,
+)
+_session_id: str | None = None  # CSRF token; reused until the daemon answers 409 with a new one
+_rpc_version: int | None = None
+
+
+async def _rpc(method: str, arguments: dict[str, Any] | None = None) -> dict[str, Any]:
+    """One RPC call. Reuses the session id, renegotiating it once on 409; a non-success result raises TransmissionError."""
+    global _session_id
+    payload = {"method": method, "arguments": arguments or {}}
+    for _ in range(2):
+        headers = {SESSION_HEADER: _session_id} if _session_id else {}
+        resp = await _upstream.request("POST", settings.transmission_path, json=payload, headers=headers)
+        if resp.status_code != 409:
+            break
+        _session_id = resp.headers.get(SESSION_HEADER)
+    resp.raise_for_status()
+    data = resp.json()
+    if data.get("result") != "success":
+        raise TransmissionError(f'{method} failed with result "{data.get("result")}"')
+    return data.get("arguments", {})
+
+
+async def _get_rpc_version() -> int:
+    global _rpc_version
+    if _rpc_version is None:
+        _rpc_version = (await _rpc("session-get", {"fields": ["rpc-version"]}))["rpc-version"]
+    return _rpc_version
+
+
+async def _torrent_get(fields: list[str], ids: list[int] | str | None = None) -> tuple[list[RpcTorrent], list[int]]:
+    """torrent-get as transmission_rpc Torrent objects, plus the removed ids reported for ids="recently-active"."""
+    arguments: dict[str, Any] = {"fields": fields}
+    if ids is not None:
+        arguments["ids"] = ids
+    result = await _rpc("torrent-get", arguments)
+    return [RpcTorrent(fields=t) for t in result["torrents"]], result.get("removed", [])
 
 
 class TorrentFile(BaseModel):
@@ -46,6 +86,112 @@ class FolderEntry(BaseModel):
     is_folder: bool = True
 
 
+class FileNode(BaseModel):
+    """Folder in a torrent's file tree; the counters cover every file beneath it."""
+
+    name: str  # full path, "" for the root
+    files: list[TorrentFile] = []
+    folders: dict[str, "FileNode"] = {}
+    file_count: int = 0
+    total_size: int = 0
+    completed_size: int = 0
+    _parent: "FileNode | None" = PrivateAttr(default=None)
+
+    def add(self, file_count: int, total_size: int, completed_size: int) -> None:
+        """Add to this folder's counters and every ancestor's."""
+        node: FileNode | None = self
+        while node is not None:
+            node.file_count += file_count
+            node.total_size += total_size
+            node.completed_size += completed_size
+            node = node._parent
+
+    def total(self) -> None:
+        """Compute the counters bottom-up from the files and subfolders."""
+        file_count, total_size, completed_size = len(self.files), 0, 0
+        for f in self.files:
+            total_size += f.size
+            completed_size += f.completed
+        for child in self.folders.values():
+            child.total()
+            file_count += child.file_count
+            total_size += child.total_size
+            completed_size += child.completed_size
+        self.file_count, self.total_size, self.completed_size = file_count, total_size, completed_size
+
+    def entry(self) -> FolderEntry:
+        return FolderEntry(name=self.name, file_count=self.file_count, total_size=self.total_size, completed_size=self.completed_size)
+
+
+class FileTree(BaseModel):
+    """Prefix tree of a torrent's files, built once per torrent and updated in place from fileStats."""
+
+    hash_string: str
+    root: FileNode
+    files: list[TorrentFile]  # by file index
+    synced_at: float | None = None  # monotonic time of the last files/fileStats fetch; None forces a refresh
+    _folders: list[FileNode] = PrivateAttr(default_factory=list)  # containing folder, by file index
+
+    @classmethod
+    def build(cls, hash_string: str, files: list[TorrentFile]) -> "FileTree":
+        root = FileNode(name="")
+        folders = []
+        for f in files:
+            node = root
+            *dirs, _ = f.name.split("/")
+            for i, part in enumerate(dirs):
+                child = node.folders.get(part)
+                if child is None:
+                    child = node.folders[part] = FileNode(name="/".join(dirs[: i + 1]))
+                    child._parent = node
+                node = child
+            node.files.append(f)
+            folders.append(node)
+        root.total()
+        tree = cls(hash_string=hash_string, root=root, files=files, synced_at=time.monotonic())
+        tree._folders = folders
+        return tree
+
+    def update(self, stats: list[dict[str, Any]]) -> None:
+        """Apply fileStats (same order as files): per-folder progress deltas walk up to the root, no path is re-split."""
+        deltas: dict[int, tuple[FileNode, int]] = {}
+        for f, folder, stat in zip(self.files, self._folders, stats, strict=True):
+            if f.priority != stat["priority"]:
+                f.priority = stat["priority"]
+            if delta := stat["bytesCompleted"] - f.completed:
+                f.completed = stat["bytesCompleted"]
+                deltas[id(folder)] = (folder, deltas.get(id(folder), (folder, 0))[1] + delta)
+        for folder, delta in deltas.values():
+            folder.add(0, 0, delta)
+        self.synced_at = time.monotonic()
+
+    def folder(self, path: str) -> FileNode:
+        node = self.root
+        for part in filter(None, path.split("/")):
+            if (node := node.folders.get(part)) is None:
+                raise ValueError(f"Folder {path} not found")
+        return node
+
+    def entries(self, folder: str = "", depth: int | None = None) -> list[TorrentFile | FolderEntry]:
+        """Files within `depth` levels of `folder` plus the folders at that depth, aggregated. None or < 1 = every file below."""
+        if depth is not None and depth < 1:
+            depth = None
+        files: list[TorrentFile] = []
+        folders: list[FolderEntry] = []
+
+        def walk(node: FileNode, level: int) -> None:
+            files.extend(node.files)
+            for child in node.folders.values():
+                if depth is None or level < depth:
+                    walk(child, level + 1)
+                else:
+                    folders.append(child.entry())
+
+        walk(self.folder(folder), 1)
+        files.sort(key=lambda f: f.index)
+        return [*files, *folders]
+
+
 TorrentStatus = Literal[
     "stopped",
     "check pending",
@@ -74,6 +220,19 @@ class Torrent(BaseModel):
     file_count: int
 
 
+class TorrentMirror(BaseModel):
+    torrents: dict[int, Torrent] = {}  # partial models: only `fields` are set
+    fields: set[str] = {"id"}  # Torrent fields kept in sync; grows with what list_torrents is asked for
+    synced_at: float | None = None  # monotonic time of the last torrent-get
+    full_synced_at: float | None = None
+    dirty: bool = False  # a tool changed torrent state; sync on the next read regardless of age
+    _lock: asyncio.Lock = PrivateAttr(default_factory=asyncio.Lock)
+
+
+_mirror = TorrentMirror()
+_file_trees: Cache[FileTree] = Cache(settings.transmission_file_tree_cache_size)
+
+
 class TorrentList(BaseModel):
     torrents: list[Torrent] | list[dict[str, Any]]
     total: int
@@ -91,80 +250,152 @@ class TorrentFileList(BaseModel):
     hint: str | None = None
 
 
-def _resolve_url(url: str) -> str:
-    """Resolve URL, following redirects to magnet links.
-
-    Jackett proxy URLs behave differently per indexer:
-    - Some return 302 redirect to magnet: link → extract magnet
-    - Some return .torrent file directly → pass URL to transmission
-
-    Transmission can handle both magnet links and torrent file URLs.
-    """
-    if url.startswith("magnet:"):
-        return url
-    try:
-        resp = httpx.get(url, follow_redirects=False, timeout=10.0)
-        if resp.status_code in (301, 302, 303, 307, 308):
-            location = resp.headers.get("location", "")
-            if location.startswith("magnet:"):
-                return location
-    except Exception:
-        pass
-    return url
-
-
-def _torrent_to_model(t: Any) -> Torrent:
-    file_count = 0
+def _file_count(t: Any) -> int:
+    fields = getattr(t, "fields", None)
+    if isinstance(fields, dict) and "file-count" in fields:
+        return fields["file-count"]
     if hasattr(t, "get_files") and callable(t.get_files):
         try:
-            file_count = len(t.get_files())
+            return len(t.get_files())
         except KeyError:
             pass  # Files not fetched yet (e.g. newly added torrent)
-    return Torrent(
-        id=t.id,
-        name=t.name,
-        status=t.status.value if hasattr(t.status, "value") else str(t.status),
-        progress=t.progress,
-        eta=int(t.eta.total_seconds()) if t.eta is not None and t.eta.total_seconds() >= 0 else None,
-        total_size=t.total_size,
-        comment=t.comment or "",
-        error_string=t.error_string or "",
-        download_speed=t.rate_download,
-        upload_speed=t.rate_upload,
-        file_count=file_count,
-    )
+    return 0
+
+
+# Torrent field -> (torrent-get fields it is built from, converter)
+_TORRENT_FIELDS: dict[str, tuple[tuple[str, ...], Callable[[Any], Any]]] = {
+    "id": (("id",), lambda t: t.id),
+    "name": (("name",), lambda t: t.name),
+    "status": (("status",), lambda t: t.status.value if hasattr(t.status, "value") else str(t.status)),
+    "progress": (("percentDone",), lambda t: t.progress),
+    "eta": (("eta",), lambda t: int(t.eta.total_seconds()) if t.eta is not None and t.eta.total_seconds() >= 0 else None),
+    "total_size": (("totalSize",), lambda t: t.total_size),
+    "comment": (("comment",), lambda t: t.comment or ""),
+    "error_string": (("errorString",), lambda t: t.error_string or ""),
+    "download_speed": (("rateDownload",), lambda t: t.rate_download),
+    "upload_speed": (("rateUpload",), lambda t: t.rate_upload),
+    "file_count": (("file-count",), _file_count),  # rpc-version < 17 has no file-count, see _rpc_fields
+}
+
+
+def _rpc_fields(rpc_version: int, fields: Iterable[str] | None = None) -> list[str]:
+    """torrent-get arguments needed to build the given Torrent fields (default: all)."""
+    rpc = [f for name in (fields or _TORRENT_FIELDS) for f in _TORRENT_FIELDS[name][0]]
+    if rpc_version < 17:
+        rpc = ["files" if f == "file-count" else f for f in rpc]
+    return sorted(set(rpc))
+
+
+def _torrent_to_model(t: Any, fields: Collection[str] | None = None) -> Torrent:
+    """Validated model; with a subset of `fields`, an unvalidated partial model carrying only those attributes."""
+    values = {name: convert(t) for name, (_, convert) in _TORRENT_FIELDS.items() if fields is None or name in fields}
+    return Torrent(**values) if len(values) == len(_TORRENT_FIELDS) else Torrent.model_construct(**values)
+
+
+def _needed_fields(fields: list[str] | None, filter_expr: str | None, sort_by: str | None) -> set[str]:
+    """Torrent fields a list_torrents call reads: the projected columns plus whatever the filter and sort touch."""
+    if not fields:
+        return set(_TORRENT_FIELDS)
+    needed = {"id", *fields}
+    if filter_expr:
+        referenced = filter_fields(filter_expr)
+        if referenced is None:
+            return set(_TORRENT_FIELDS)
+        needed |= referenced
+    if sort_by:
+        needed.add(sort_by.lstrip("-"))
+    return needed & _TORRENT_FIELDS.keys()
+
+
+async def _sync_torrents(needed: set[str] | None = None) -> list[Torrent]:
+    """Torrents from the local mirror, refreshed when older than transmission_mirror_max_age.
+
+    Refreshes fetch only recently-active torrents (plus removed ids) while the previous sync is inside
+    Transmission's recently-active window; otherwise, and every transmission_full_sync_interval, all torrents.
+    Only the mirrored fields are requested; asking for a field the mirror lacks adds it and forces a full sync.
+    """
+    needed = set(_TORRENT_FIELDS) if needed is None else needed | {"id"}
+    async with _mirror._lock:
+        now = time.monotonic()
+        grow = not needed <= _mirror.fields
+        if (
+            not grow
+            and _mirror.synced_at is not None
+            and not _mirror.dirty
+            and now - _mirror.synced_at < settings.transmission_mirror_max_age
+        ):
+            return list(_mirror.torrents.values())
+        _mirror.fields |= needed
+        rpc_fields = _rpc_fields(await _get_rpc_version(), _mirror.fields)
+        if (
+            grow
+            or _mirror.synced_at is None
+            or now - _mirror.synced_at >= RECENTLY_ACTIVE_WINDOW
+            or now - _mirror.full_synced_at >= settings.transmission_full_sync_interval
+        ):
+            torrents, _ = await _torrent_get(rpc_fields)
+            _mirror.torrents = {t.id: _torrent_to_model(t, _mirror.fields) for t in torrents}
+            _mirror.full_synced_at = now
+        else:
+            active, removed = await _torrent_get(rpc_fields, "recently-active")
+            for torrent_id in removed:
+                _mirror.torrents.pop(torrent_id, None)
+            for t in active:
+                _mirror.torrents[t.id] = _torrent_to_model(t, _mirror.fields)
+        _mirror.synced_at = now
+        _mirror.dirty = False
+        return list(_mirror.torrents.values())
 
 
-def _aggregate_by_depth(files: list[TorrentFile], depth: int) -> list[BaseModel]:
-    """Aggregate files into folders up to given depth."""
-    if depth < 1:
-        return list(files)
+def _mark_dirty() -> None:
+    _mirror.dirty = True
 
-    folders: dict[str, FolderEntry] = {}
-    result: list[BaseModel] = []
 
-    for f in files:
-        parts = f.name.split("/")
-        if len(parts) <= depth:
-            result.append(f)
-        else:
-            folder_path = "/".join(parts[:depth])
-            if folder_path not in folders:
-                folders[folder_path] = FolderEntry(
-                    name=folder_path,
-                    file_count=0,
-                    total_size=0,
-                    completed_size=0,
-                )
-            folders[folder_path].file_count += 1
-            folders[folder_path].total_size += f.size
-            folders[folder_path].completed_size += f.completed
+def _build_file_tree(t: RpcTorrent) -> FileTree:
+    files = []
+    for i, f in enumerate(t.get_files()):
+        prio = f.priority.value if hasattr(f.priority, "value") else (f.priority or 1)
+        files.append(TorrentFile(index=i, name=f.name, size=f.size, completed=f.completed, priority=prio))
+    return FileTree.build(t.fields["hashString"], files)
 
-    return result + list(folders.values())
+
+async def _file_tree(torrent_id: int) -> FileTree:
+    """The torrent's cached FileTree, refreshed from fileStats (no names) once older than transmission_mirror_max_age.
+
+    The tree is rebuilt from the full file list on first use, or when the cached one no longer matches the
+    torrent behind the id (different hash, or metadata arrived and the file count changed).
+    """
+    key = str(torrent_id)
+    tree = _file_trees.get(key)
+    if tree is not None:
+        if tree.synced_at is not None and time.monotonic() - tree.synced_at < settings.transmission_mirror_max_age:
+            return tree
+        torrents, _ = await _torrent_get(["id", "hashString", "fileStats"], [torrent_id])
+        if not torrents:
+            _file_trees.pop(key)
+            raise ValueError(f"Torrent {torrent_id} not found")
+        stats = torrents[0].fields["fileStats"]
+        if torrents[0].fields["hashString"] == tree.hash_string and len(stats) == len(tree.files):
+            tree.update(stats)
+            return tree
+    torrents, _ = await _torrent_get(["id", "hashString", "files", "priorities", "wanted"], [torrent_id])
+    if not torrents:
+        raise ValueError(f"Torrent {torrent_id} not found")
+    tree = _file_trees[key] = _build_file_tree(torrents[0])
+    return tree
+
+
+def _forget_file_trees(torrent_ids: list[int], remove: bool = False) -> None:
+    """Force the next list_files to refresh these torrents' trees, or drop them when the torrents are gone."""
+    for torrent_id in torrent_ids:
+        if remove:
+            _file_trees.pop(str(torrent_id))
+        elif (tree := _file_trees.get(str(torrent_id))) is not None:
+            tree.synced_at = None
 
 
 @mcp.tool
-def list_torrents(
+async def list_torrents(
     filter_expr: Annotated[
         str | None,
         Field(description="JMESPath. Downloaded: progress==`100` (NOT status). Active: status=='downloading'. Text: search(@, 'text')"),
@@ -184,59 +415,64 @@ def list_torrents(
     Fields: name, status, progress, eta, total_size, error_string, download_speed, file_count.
     CRITICAL: downloaded/completed = progress==`100` ONLY.
     NEVER use status for downloaded. status=='downloading' = ACTIVELY in-progress."""
-    torrents = get_client().get_torrents()
-    items = [_torrent_to_model(t) for t in torrents]
-    filtered = apply_query(items, filter_expr, sort_by, limit=None)
-    paginated, total, has_more = paginate(filtered, limit, offset)
-    result = project(paginated, fields)
-    return TsvList(data=to_tsv(result), total=total, offset=offset, has_more=has_more)
+    items = await _sync_torrents(_needed_fields(fields, filter_expr, sort_by))
+    paginated, total, has_more = query_page(items, filter_expr, sort_by, limit, offset)
+    return TsvList(data=to_tsv(paginated, fields), total=total, offset=offset, has_more=has_more)
 
 
 @mcp.tool
-def add_torrent(
+async def add_torrent(
     url: Annotated[str, Field(description="URL or magnet")],
     download_dir: Annotated[str | None, Field(description="Download directory")] = None,
 ) -> Torrent:
     """Add torrent by URL or magnet."""
-    client = get_client()
-    resolved_url = _resolve_url(url)
-    t = client.add_torrent(resolved_url, download_dir=download_dir)
-    full_torrent = client.get_torrent(t.id)
-    return _torrent_to_model(full_torrent)
+    arguments = {"filename": await resolve_url(url)}
+    if download_dir:
+        arguments["download-dir"] = download_dir
+    result = await _rpc("torrent-add", arguments)
+    added = result.get("torrent-added") or result["torrent-duplicate"]
+    torrents, _ = await _torrent_get(_rpc_fields(await _get_rpc_version()), [added["id"]])
+    _mark_dirty()
+    return _torrent_to_model(torrents[0])
 
 
 @mcp.tool
-def remove_torrent(
+async def remove_torrent(
     torrent_id: Annotated[int, Field()],
     delete_data: Annotated[bool, Field(description="Delete downloaded data")] = False,
 ) -> bool:
     """Remove torrent, optionally delete data."""
-    get_client().remove_torrent(torrent_id, delete_data=delete_data)
+    await _rpc("torrent-remove", {"ids": [torrent_id], "delete-local-data": delete_data})
+    _mark_dirty()
+    _forget_file_trees([torrent_id], remove=True)
     return True
 
 
 @mcp.tool
-def pause_torrent(
+async def pause_torrent(
     torrent_id: Annotated[int, Field()],
 ) -> bool:
     """Pause torrent."""
-    get_client().stop_torrent(torrent_id)
+    await _rpc("torrent-stop", {"ids": [torrent_id]})
+    _mark_dirty()
     return True
 
 
 @mcp.tool
-def resume_torrent(
+async def resume_torrent(
     torrent_id: Annotated[int, Field()],
 ) -> bool:
     """Resume torrent."""
-    get_client().start_torrent(torrent_id)
+    await _rpc("torrent-start", {"ids": [torrent_id]})
+    _mark_dirty()
     return True
 
 
 @mcp.tool
-def list_files(
+async def list_files(
     torrent_id: Annotated[int, Field()],
     depth: Annotated[int | None, Field(description="Depth. 1=top, 2=sub, None=all")] = 1,
+    folder: Annotated[str | None, Field(description="Folder name from a previous listing; depth counts from it")] = None,
     filter_expr: Annotated[str | None, Field(description="JMESPath filter; search(@, 'text') for text search")] = None,
     fields: Annotated[list[str] | None, Field(description="Fields (index auto-incl.)")] = None,
     sort_by: Annotated[str | None, Field(description="Sort field, - prefix for desc")] = None,
@@ -244,22 +480,19 @@ def list_files(
     offset: Annotated[int, Field()] = 0,
 ) -> TorrentFileList:
     """List torrent files/folders. Fields: name, size, completed, priority | file_count, total_size, is_folder"""
-    rpc_torrent = get_client().get_torrent(torrent_id)
-    files = []
-    for i, f in enumerate(rpc_torrent.get_files()):
-        prio = f.priority.value if hasattr(f.priority, "value") else (f.priority or 1)
-        files.append(TorrentFile(index=i, name=f.name, size=f.size, completed=f.completed, priority=prio))
-
-    entries = _aggregate_by_depth(files, depth) if depth else files
-    filtered = apply_query(entries, filter_expr, sort_by, limit=None)
-    paginated, total, has_more = paginate(filtered, limit, offset)
+    tree = await _file_tree(torrent_id)
+    entries = tree.entries(folder or "", depth)
+    paginated, total, has_more = query_page(entries, filter_expr, sort_by, limit, offset)
     result = project(paginated, fields)
 
     hint = None
     if depth is not None and not fields:
         has_folders = any(isinstance(e, FolderEntry) for e in paginated)
         if has_folders:
-            hint = f"Folders found. To see their contents, increase depth (e.g., depth={depth + 1}) or use depth=None for all files."
+            hint = (
+                "Folders found. To see their contents, pass folder=<name>, "
+                f"increase depth (e.g., depth={depth + 1}) or use depth=None for all files."
+            )
 
     return TorrentFileList(
         torrent_id=torrent_id,
@@ -272,25 +505,163 @@ def list_files(
     )
 
 
+_PRIORITY_ARGUMENTS = {1: "priority-low", 2: "priority-normal", 3: "priority-high"}
+
+
+def _priority_arguments(groups: dict[int, list[int]]) -> dict[str, list[int]]:
+    """torrent-set arguments for {priority: file indices}; one RPC covers wanted/unwanted and every priority level."""
+    arguments: dict[str, list[int]] = {}
+    seen: set[int] = set()
+    for priority, indices in sorted(groups.items()):
+        if priority not in (0, 1, 2, 3):
+            raise ValueError(f"Invalid priority {priority}, expected 0-3")
+        if not indices:
+            continue  # Transmission reads an empty index list as "all files"
+        if overlap := seen.intersection(indices):
+            raise ValueError(f"File indices {sorted(overlap)} given more than one priority")
+        seen.update(indices)
+        if priority == 0:
+            arguments["files-unwanted"] = indices
+        else:
+            arguments.setdefault("files-wanted", []).extend(indices)
+            arguments[_PRIORITY_ARGUMENTS[priority]] = indices
+    return arguments
+
+
 @mcp.tool
-def set_file_priorities(
-    torrent_id: Annotated[int, Field()],
-    file_indices: Annotated[list[int], Field(description="File indices from list_files")],
-    priority: Annotated[int, Field(description="0=skip, 1=low, 2=normal, 3=high")],
+async def set_file_priorities(
+    torrent_id: Annotated[int | list[int], Field(description="Torrent id, or ids to apply the same indices to")],
+    file_indices: Annotated[list[int] | None, Field(description="File indices from list_files")] = None,
+    priority: Annotated[int | None, Field(description="0=skip, 1=low, 2=normal, 3=high")] = None,
+    priorities: Annotated[
+        dict[int, list[int]] | None,
+        Field(description="Several groups at once: {priority: file_indices}, e.g. {0: [4, 5], 3: [0, 1, 2]}"),
+    ] = None,
 ) -> bool:
-    """Set file download priority."""
-    client = get_client()
-    if priority == 0:
-        client.change_torrent(torrent_id, files_unwanted=file_indices)
-    else:
-        client.change_torrent(torrent_id, files_wanted=file_indices)
-        if priority == 1:
-            client.change_torrent(torrent_id, priority_low=file_indices)
-        elif priority == 2:
-            client.change_torrent(torrent_id, priority_normal=file_indices)
-        elif priority == 3:
-            client.change_torrent(torrent_id, priority_high=file_indices)
+    """Set file download priority. Use priorities to change several groups in one call."""
+    groups = dict(priorities or {})
+    if file_indices is not None or priority is not None:
+        if file_indices is None or priority is None:
+            raise ValueError("file_indices and priority go together")
+        groups[priority] = groups.get(priority, []) + file_indices
+    arguments = _priority_arguments(groups)
+    if not arguments:
+        raise ValueError("Provide file_indices with priority, or priorities")
+    ids = torrent_id if isinstance(torrent_id, list) else [torrent_id]
+    await _rpc("torrent-set", {"ids": ids} | arguments)
+    _forget_file_trees(ids)
     return True
 
 
+class TorrentEvent(BaseModel):
+    type: Literal["added", "completed", "stalled", "errored", "speed"]
+    torrent_id: int
+    name: str
+    progress: float
+    download_speed: int
+    error_string: str
+    at: float = Field(default_factory=time.time)
+
+
+class TorrentWatch(BaseModel):
+    """Torrent snapshot the watcher diffs against, plus per-torrent stall tracking and the live subscribers."""
+
+    torrents: dict[int, Torrent] | None = None  # None until the first sync sets the baseline
+    idle_since: dict[int, float] = {}  # monotonic time a downloading torrent's speed dropped to 0
+    stalled: set[int] = set()  # stalled event sent; cleared once the torrent moves again
+    _subscribers: list[asyncio.Queue[TorrentEvent]] = PrivateAttr(default_factory=list)
+    _task: asyncio.Task | None = PrivateAttr(default=None)
+
+    def diff(self, torrents: list[Torrent], now: float) -> list[TorrentEvent]:
+        """Events between the previous snapshot and `torrents`; the first call only records the baseline."""
+        prev, self.torrents = self.torrents, {t.id: t for t in torrents}
+        threshold = settings.transmission_speed_threshold
+        events = []
+        for t in torrents:
+            kinds = []
+            old = prev.get(t.id) if prev is not None else t
+            if old is None:
+                kinds.append("added")
+            else:
+                if t.progress >= 100 > old.progress:
+                    kinds.append("completed")
+                if t.error_string and not old.error_string:
+                    kinds.append("errored")
+                if threshold is not None and (t.download_speed >= threshold) != (old.download_speed >= threshold):
+                    kinds.append("speed")
+            if t.status == "downloading" and t.progress < 100 and t.download_speed == 0:
+                idle_since = self.idle_since.setdefault(t.id, now)
+                if now - idle_since >= settings.transmission_stall_after and t.id not in self.stalled:
+                    self.stalled.add(t.id)
+                    kinds.append("stalled")
+            else:
+                self.idle_since.pop(t.id, None)
+                self.stalled.discard(t.id)
+            events += [
+                TorrentEvent(
+                    type=kind,
+                    torrent_id=t.id,
+                    name=t.name,
+                    progress=t.progress,
+                    download_speed=t.download_speed,
+                    error_string=t.error_string,
+                )
+                for kind in kinds
+            ]
+        for torrent_id in self.idle_since.keys() - self.torrents.keys():
+            del self.idle_since[torrent_id]
+            self.stalled.discard(torrent_id)
+        return events
+
+    def publish(self, event: TorrentEvent) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+_WATCH_FIELDS = {"id", "name", "status", "progress", "error_string", "download_speed"}
+_watch = TorrentWatch()
+
+
+async def _watch_torrents() -> None:
+    """Diff the torrent mirror every transmission_watch_interval while anyone is subscribed.
+
+    Goes through _sync_torrents, so each tick is at most a recently-active delta of the watched fields.
+    """
+    failures = 0
+    while _watch._subscribers:
+        try:
+            for event in _watch.diff(await _sync_torrents(_WATCH_FIELDS), time.monotonic()):
+                _watch.publish(event)
+            failures = 0
+        except (httpx.HTTPError, TransmissionError):
+            pass  # daemon unreachable; the next tick retries
+        except Exception:
+            # A bug must not silently end the stream for every subscriber; log it and retry less often
+            failures += 1
+            logger.exception("Torrent watcher tick failed ({} in a row)", failures)
+        delay = settings.transmission_watch_interval * 2 ** min(failures, 10)
+        await asyncio.sleep(min(delay, WATCH_MAX_BACKOFF))
+
+
+async def torrent_events(heartbeat: float | None = None) -> AsyncGenerator[TorrentEvent | None, None]:
+    """Torrent events as they happen; yields None after `heartbeat` seconds without one.
+
+    The watcher starts with the first subscriber and stops polling once the last one leaves.
+    """
+    queue: asyncio.Queue[TorrentEvent] = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+    _watch._subscribers.append(queue)
+    if _watch._task is None or _watch._task.done():
+        _watch._task = asyncio.create_task(_watch_torrents())
+    try:
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), heartbeat)
+            except TimeoutError:
+                yield None
+    finally:
+        _watch._subscribers.remove(queue)
+
+
 optimize_tool_schemas(mcp)
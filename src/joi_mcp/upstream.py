@@ -0,0 +1,179 @@
+import asyncio
+import bisect
+import time
+from typing import Any, Literal
+
+import httpx
+from pydantic import BaseModel, Field, computed_field
+
+from joi_mcp.config import settings
+
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # seconds; a final +Inf bucket follows
+FAILURE_STATUSES = (502, 503, 504)  # the upstream itself is down; other 5xx are answers from a live service
+
+
+class UpstreamUnavailableError(httpx.TransportError):
+    """Raised without sending anything while an upstream's circuit breaker is open."""
+
+
+class LatencyHistogram(BaseModel):
+    buckets: tuple[float, ...] = LATENCY_BUCKETS
+    counts: list[int] = Field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    count: int = 0
+    total: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile; inf when it falls past the last bucket."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    @computed_field
+    @property
+    def p50(self) -> float | None:
+        return self.quantile(0.5)
+
+    @computed_field
+    @property
+    def p95(self) -> float | None:
+        return self.quantile(0.95)
+
+
+class CircuitBreaker(BaseModel):
+    """Opens after upstream_breaker_failures consecutive failures; after upstream_breaker_cooldown one probe goes through."""
+
+    failures: int = 0  # consecutive
+    opened_at: float | None = None  # monotonic
+    probing: bool = False
+    trips: int = 0
+
+    def state(self, now: float) -> Literal["closed", "open", "half_open"]:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if now - self.opened_at < settings.upstream_breaker_cooldown else "half_open"
+
+    def rejects(self, now: float) -> bool:
+        state = self.state(now)
+        return state == "open" or (state == "half_open" and self.probing)
+
+    def admit(self, now: float) -> bool:
+        """Whether a request may go out now; in half-open state only the first one does, as the probe."""
+        if self.rejects(now):
+            return False
+        if self.opened_at is not None:
+            self.probing = True
+        return True
+
+    def record(self, ok: bool, now: float) -> None:
+        self.probing = False
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= settings.upstream_breaker_failures:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = now
+
+
+class UpstreamStats(BaseModel):
+    requests: int = 0
+    failures: int = 0
+    rejected: int = Field(default=0, description="Failed fast by the open breaker")
+    state: Literal["closed", "open", "half_open"] = "closed"
+    trips: int = 0
+    latency: LatencyHistogram = Field(default_factory=LatencyHistogram)
+
+
+class Upstream:
+    """One upstream service: a lazily created pooled httpx.AsyncClient, a concurrency cap, a circuit breaker
+    and a latency histogram. All joi_mcp HTTP traffic goes through one of these.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, **client_kwargs: Any):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.client_kwargs = {"timeout": 30.0} | client_kwargs
+        self._client: httpx.AsyncClient | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self.reset()
+        _registry[name] = self
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_concurrency, keepalive_expiry=60.0)
+            self._client = httpx.AsyncClient(limits=limits, **self.client_kwargs)
+        return self._client
+
+    @client.setter
+    def client(self, client: httpx.AsyncClient | None) -> None:
+        self._client = client
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def reset(self) -> None:
+        """Forget the client, semaphore, breaker and histogram (tests, and config reloads)."""
+        self._client = None
+        self._semaphore = None
+        self.breaker = CircuitBreaker()
+        self.stats = UpstreamStats()
+
+    def _unavailable(self) -> UpstreamUnavailableError:
+        self.stats.rejected += 1
+        remaining = max(0.0, self.breaker.opened_at + settings.upstream_breaker_cooldown - time.monotonic())
+        return UpstreamUnavailableError(
+            f"{self.name} is unavailable after {self.breaker.failures} consecutive failures; retrying in {remaining:.0f}s"
+        )
+
+    async def request(self, method: str, url: str, *, stream: bool = False, **kwargs: Any) -> httpx.Response:
+        """Send a request; transport errors and 502/503/504 count against the breaker. stream=True leaves the body unread."""
+        if self.breaker.rejects(time.monotonic()):
+            raise self._unavailable()  # don't queue behind the semaphore for an upstream known to be down
+        async with self._get_semaphore():
+            if not self.breaker.admit(time.monotonic()):
+                raise self._unavailable()
+            self.stats.requests += 1
+            started = time.monotonic()
+            try:
+                resp = await self.client.send(self.client.build_request(method, url, **kwargs), stream=stream)
+            except httpx.TransportError:
+                self._record(False, started)
+                raise
+            except BaseException:
+                self.breaker.probing = False  # cancelled: no verdict either way
+                raise
+            self._record(resp.status_code not in FAILURE_STATUSES, started)
+            return resp
+
+    def _record(self, ok: bool, started: float) -> None:
+        now = time.monotonic()
+        self.stats.latency.observe(now - started)
+        if not ok:
+            self.stats.failures += 1
+        self.breaker.record(ok, now)
+        self.stats.trips = self.breaker.trips
+
+
+_registry: dict[str, Upstream] = {}
+
+
+def upstream_stats() -> dict[str, UpstreamStats]:
+    now = time.monotonic()
+    for upstream in _registry.values():
+        upstream.stats.state = upstream.breaker.state(now)
+    return {name: upstream.stats for name, upstream in _registry.items()}
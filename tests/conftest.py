@@ -10,11 +10,6 @@ if not os.getenv("TMDB_API_KEY"):
     os.environ["TMDB_API_KEY"] = "dummy_key_for_vcr_replay"
 
 import pytest  # noqa: E402
-import tmdbsimple as tmdb  # noqa: E402
-
-# Also set directly on module for modules already imported
-if not tmdb.API_KEY:
-    tmdb.API_KEY = os.environ["TMDB_API_KEY"]
 
 
 @pytest.fixture(scope="module")
@@ -23,6 +18,7 @@ def vcr_config():
         "filter_query_parameters": ["api_key"],
         "filter_headers": ["authorization", "x-transmission-session-id"],
         "record_mode": "once",
+        "decode_compressed_response": True,
     }
 
 
@@ -30,9 +26,49 @@ def vcr_config():
 def reset_transmission_client():
     import joi_mcp.transmission as tm
 
-    tm._client = None
+    def reset():
+        tm._session_id = None
+        tm._rpc_version = None
+        tm._mirror = tm.TorrentMirror()
+        tm._file_trees.clear()
+        tm._watch = tm.TorrentWatch()
+
+    reset()
+    yield
+    reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_links():
+    import joi_mcp.links as links
+
+    links._resolved.clear()
+    links._resolving.clear()
+    yield
+    links._resolved.clear()
+    links._resolving.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_tmdb_client():
+    import joi_mcp.tmdb as tmdb
+
+    for cache in tmdb._caches.values():
+        cache.clear()
+    yield
+    for cache in tmdb._caches.values():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_upstreams():
+    from joi_mcp.upstream import _registry
+
+    for upstream in _registry.values():
+        upstream.reset()
     yield
-    tm._client = None
+    for upstream in _registry.values():
+        upstream.reset()
 
 
 def pytest_addoption(parser):
@@ -0,0 +1,206 @@
+import json
+from contextlib import AsyncExitStack, asynccontextmanager
+
+import anyio
+import httpx
+import pytest
+from langchain_core.tools import StructuredTool
+
+import joi_agent_langgraph2.graph as agent_graph
+import joi_agent_langgraph2.tools as media_tools
+from joi_agent_langgraph2.graph import _GraphFactory
+from joi_agent_langgraph2.tools import load_media_tools, strip_namespaces
+from joi_mcp.jackett import TorrentDetail, _cache
+
+
+def _tool(name: str) -> StructuredTool:
+    return StructuredTool.from_function(lambda: "", name=name, description=name)
+
+
+@pytest.mark.unit
+class TestStripNamespaces:
+    def test_strips_server_prefixes_only(self):
+        tools = [_tool("transmission_add_torrent"), _tool("tmdb_search_media"), _tool("jackett_get_torrent"), _tool("think")]
+        assert [t.name for t in strip_namespaces(tools)] == ["add_torrent", "search_media", "get_torrent", "think"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestInProcessTransport:
+    @pytest.fixture(autouse=True)
+    def in_process(self, monkeypatch):
+        monkeypatch.setattr(media_tools.settings, "mcp_transport", "in_process")
+        _cache["jkt_0000beef"] = TorrentDetail(id="jkt_0000beef", title="Ubuntu", size=1, link="http://jackett/dl/1")
+        yield
+        _cache.clear()
+
+    async def test_stripped_name_calls_namespaced_gateway_tool(self):
+        async with AsyncExitStack() as stack:
+            tools = {t.name: t for t in await load_media_tools(stack)}
+            assert {"get_torrent", "add_torrent", "search_media"} <= tools.keys()
+            assert not any(name.startswith("jackett_") for name in tools)
+            result = await tools["get_torrent"].ainvoke({"id": "jkt_0000beef"})
+        assert "Ubuntu" in str(result)
+
+    async def test_session_closed_with_stack(self):
+        async with AsyncExitStack() as stack:
+            tools = {t.name: t for t in await load_media_tools(stack)}
+        with pytest.raises(anyio.ClosedResourceError):
+            await tools["get_torrent"].ainvoke({"id": "jkt_0000beef"})
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestGraphFactory:
+    @pytest.fixture
+    def factory(self, monkeypatch):
+        factory = _GraphFactory()
+        events: list[str] = []
+
+        @asynccontextmanager
+        async def session():
+            events.append("open")
+            yield
+            events.append("close")
+
+        async def build():
+            await factory._stack.enter_async_context(session())
+            return object()
+
+        monkeypatch.setattr(factory, "_build", build)
+        return factory, events
+
+    @pytest.mark.parametrize("transport", ["in_process", "gateway"])
+    async def test_graph_and_session_kept_across_runs(self, factory, monkeypatch, transport):
+        monkeypatch.setattr("joi_agent_langgraph2.graph.settings.mcp_transport", transport)
+        factory, events = factory
+        async with factory as first:
+            async with factory as second:
+                assert first is second
+        async with factory as third:
+            assert third is first
+        assert events == ["open"]
+
+    async def test_aclose_closes_session_and_rebuilds_on_next_run(self, factory):
+        factory, events = factory
+        async with factory as first:
+            pass
+        await factory.aclose()
+        assert events == ["open", "close"]
+        async with factory as second:
+            assert second is not first
+        assert events == ["open", "close", "open"]
+
+    async def test_shutdown_closes_factory(self, monkeypatch):
+        closed: list[bool] = []
+
+        async def aclose():
+            closed.append(True)
+
+        monkeypatch.setattr(agent_graph._factory, "aclose", aclose)
+        async with agent_graph.lifespan(agent_graph.app):
+            assert closed == []
+        assert closed == [True]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestToolCatalogCache:
+    @pytest.fixture
+    def served(self, tmp_path, monkeypatch):
+        """Catalog requests go to joi_mcp's ASGI app; returns the (path, status) of each response."""
+        from joi_mcp.server import app
+
+        monkeypatch.setattr(media_tools.settings, "mcp_transport", "gateway")
+        monkeypatch.setattr(media_tools, "TOOLS_CACHE_PATH", tmp_path / "mcp_tools.json")
+        seen: list[tuple[str, int]] = []
+
+        async def record(response: httpx.Response) -> None:
+            seen.append((response.request.url.path, response.status_code))
+
+        def client() -> httpx.AsyncClient:
+            return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), event_hooks={"response": [record]})
+
+        monkeypatch.setattr(media_tools, "_catalog_client", client)
+        return seen
+
+    @staticmethod
+    async def _load() -> list[str]:
+        async with AsyncExitStack() as stack:
+            return sorted(t.name for t in await load_media_tools(stack))
+
+    @staticmethod
+    def _cached() -> dict:
+        return json.loads(media_tools.TOOLS_CACHE_PATH.read_text())
+
+    async def test_fetched_once_then_revalidated(self, served, monkeypatch):
+        names = await self._load()
+        assert {"add_torrent", "get_torrent", "search_media"} <= set(names)
+        assert served == [("/tools/mcp", 200)]
+        written = media_tools.TOOLS_CACHE_PATH.stat().st_mtime_ns
+        rewrites: list[dict] = []
+        monkeypatch.setattr(media_tools, "_write_tools_cache", rewrites.append)
+        assert await self._load() == names
+        assert served[1:] == [("/tools/mcp", 304)]
+        assert rewrites == []
+        assert media_tools.TOOLS_CACHE_PATH.stat().st_mtime_ns == written
+
+    async def test_changed_version_rewrites_cache(self, served, tmp_path):
+        await self._load()
+        cached = self._cached()
+        (url,) = cached
+        version = cached[url]["version"]
+        cached[url] = {"version": "old", "tools": cached[url]["tools"][:1]}
+        media_tools.TOOLS_CACHE_PATH.write_text(json.dumps(cached))
+        names = await self._load()
+        assert served[-1] == ("/tools/mcp", 200)
+        assert self._cached()[url]["version"] == version
+        assert len(names) == len(self._cached()[url]["tools"]) > 1
+        assert list(tmp_path.iterdir()) == [media_tools.TOOLS_CACHE_PATH]  # no temp file left behind
+
+    async def test_per_server_endpoints(self, served, monkeypatch):
+        monkeypatch.setattr(media_tools.settings, "mcp_transport", "servers")
+        names = await self._load()
+        assert sorted(served) == [("/tools/jackett", 200), ("/tools/tmdb", 200), ("/tools/transmission", 200)]
+        assert "get_torrent" in names
+        assert len(self._cached()) == 3
+
+    async def test_unreachable_server_uses_cached_copy(self, served, monkeypatch):
+        names = await self._load()
+
+        def refused(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused")
+
+        monkeypatch.setattr(media_tools, "_catalog_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(refused)))
+        assert await self._load() == names
+
+    @pytest.mark.parametrize("content", ["not json", '{"http://127.0.0.1:8000/tools/mcp": {"tools": []}}', "[]"])
+    async def test_malformed_cache_refetched(self, served, content):
+        media_tools.TOOLS_CACHE_PATH.write_text(content)
+        assert "get_torrent" in await self._load()
+        assert served == [("/tools/mcp", 200)]
+        assert set(self._cached()[next(iter(self._cached()))]) == {"version", "tools"}
+
+    async def test_no_catalog_falls_back_to_mcp_listing(self, served, monkeypatch):
+        def missing(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(404)
+
+        async def get_tools(self):
+            return [_tool("jackett_get_torrent")]
+
+        monkeypatch.setattr(media_tools, "_catalog_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(missing)))
+        monkeypatch.setattr(media_tools.MultiServerMCPClient, "get_tools", get_tools)
+        assert await self._load() == ["get_torrent"]
+        assert not media_tools.TOOLS_CACHE_PATH.exists()
+
+    async def test_malformed_response_falls_back_to_mcp_listing(self, served, monkeypatch):
+        async def get_tools(self):
+            return [_tool("tmdb_search_media")]
+
+        monkeypatch.setattr(
+            media_tools,
+            "_catalog_client",
+            lambda: httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"tools": []}))),
+        )
+        monkeypatch.setattr(media_tools.MultiServerMCPClient, "get_tools", get_tools)
+        assert await self._load() == ["search_media"]
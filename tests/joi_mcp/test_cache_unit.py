@@ -0,0 +1,97 @@
+import json
+import time
+
+import pytest
+
+from joi_mcp.cache import Cache, SqliteStore
+
+
+@pytest.mark.unit
+class TestCache:
+    def test_lru_eviction_and_stats(self):
+        cache: Cache[int] = Cache(maxsize=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        assert cache["a"] == 1  # a is now most recent
+        cache["c"] = 3
+        assert "b" not in cache
+        assert set(cache.keys()) == {"a", "c"}
+        assert cache.stats.evictions == 1
+        assert cache.stats.hits == 1
+
+    def test_hit_rate(self):
+        cache: Cache[int] = Cache(maxsize=2)
+        assert cache.stats.hit_rate == 0.0
+        cache["a"] = 1
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+        assert cache.stats.hit_rate == pytest.approx(2 / 3)
+        assert cache.stats.model_dump()["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_missing_key(self):
+        cache: Cache[int] = Cache(maxsize=2)
+        assert cache.get("x") is None
+        with pytest.raises(KeyError):
+            cache["x"]
+        assert cache.stats.misses == 2
+
+    def test_ttl_expiry(self):
+        cache: Cache[int] = Cache(maxsize=2, ttl=0.01)
+        cache["a"] = 1
+        assert cache.get("a") == 1
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_stale_window(self):
+        cache: Cache[int] = Cache(maxsize=2, ttl=0.0, stale_ttl=60.0)
+        cache["a"] = 1
+        assert cache.lookup("a") == (1, False)
+        assert cache.get("a") is None
+        assert cache.stats.stale_hits == 2
+
+    def test_store_requires_serializers(self, tmp_path):
+        with pytest.raises(ValueError, match="dumps/loads"):
+            Cache(maxsize=2, store=SqliteStore(tmp_path / "c.db", "t"))
+
+
+@pytest.mark.unit
+class TestSqliteStore:
+    def _cache(self, path, maxsize=10) -> Cache[dict]:
+        return Cache(maxsize=maxsize, store=SqliteStore(path, "items"), dumps=json.dumps, loads=json.loads)
+
+    def test_survives_new_instance(self, tmp_path):
+        self._cache(tmp_path / "c.db")["k"] = {"v": 1}
+        assert self._cache(tmp_path / "c.db")["k"] == {"v": 1}
+
+    def test_evicted_entries_reload_from_store(self, tmp_path):
+        cache = self._cache(tmp_path / "c.db", maxsize=1)
+        cache["a"] = {"v": 1}
+        cache["b"] = {"v": 2}
+        assert list(cache.keys()) == ["b"]
+        assert cache["a"] == {"v": 1}
+
+    def test_clear_clears_store(self, tmp_path):
+        cache = self._cache(tmp_path / "c.db")
+        cache["a"] = {"v": 1}
+        cache.clear()
+        assert "a" not in self._cache(tmp_path / "c.db")
+
+    def test_pop_removes_from_store(self, tmp_path):
+        cache = self._cache(tmp_path / "c.db")
+        cache["a"] = {"v": 1}
+        cache["b"] = {"v": 2}
+        cache.pop("a")
+        cache.pop("missing")
+        assert "a" not in cache
+        assert list(self._cache(tmp_path / "c.db").keys()) == []
+        assert self._cache(tmp_path / "c.db")["b"] == {"v": 2}
+
+    def test_workers_share_one_file(self, tmp_path):
+        # Two live caches on one file stand in for two uvicorn workers
+        first, second = self._cache(tmp_path / "c.db"), self._cache(tmp_path / "c.db")
+        first["jkt_1"] = {"v": 1}
+        assert second["jkt_1"] == {"v": 1}
+        second["jkt_2"] = {"v": 2}
+        assert first["jkt_2"] == {"v": 2}
@@ -0,0 +1,15 @@
+import pytest
+
+from joi_mcp.config import SHARED_CACHE_PATH, Settings
+
+
+@pytest.mark.unit
+class TestWorkers:
+    def test_single_worker_keeps_caches_in_memory(self):
+        assert Settings(workers=1).cache_path is None
+
+    def test_workers_default_to_shared_cache(self):
+        assert Settings(workers=4).cache_path == SHARED_CACHE_PATH
+
+    def test_explicit_cache_path_kept(self, tmp_path):
+        assert Settings(workers=4, cache_path=str(tmp_path / "c.db")).cache_path == str(tmp_path / "c.db")
@@ -0,0 +1,57 @@
+import httpx
+import pytest
+from fastmcp import Client
+
+from joi_mcp.gateway import SERVERS, mcp
+from joi_mcp.jackett import TorrentDetail, _cache
+from joi_mcp.schema import tool_catalog
+from joi_mcp.server import app
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestGateway:
+    async def test_every_tool_namespaced_with_its_schema(self):
+        gateway_tools = {t.name: t.to_mcp_tool() for t in await mcp.list_tools()}
+        expected = {}
+        for namespace, server in SERVERS.items():
+            for tool in await server.list_tools():
+                expected[f"{namespace}_{tool.name}"] = tool.to_mcp_tool()
+        assert gateway_tools.keys() == expected.keys()
+        for name, tool in gateway_tools.items():
+            assert tool.inputSchema == expected[name].inputSchema
+            assert tool.description == expected[name].description
+
+    async def test_in_process_call_routes_to_server(self):
+        _cache["jkt_0000beef"] = TorrentDetail(id="jkt_0000beef", title="Ubuntu", size=1, link="http://jackett/dl/1")
+        async with Client(mcp) as client:
+            result = await client.call_tool("jackett_get_torrent", {"id": "jkt_0000beef"})
+        assert result.structured_content["title"] == "Ubuntu"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestToolCatalog:
+    async def test_computed_once_and_matches_tools_list(self):
+        catalog = await tool_catalog(mcp)
+        assert await tool_catalog(mcp) is catalog
+        async with Client(mcp) as client:
+            listed = [t.model_dump(mode="json", by_alias=True, exclude_none=True) for t in await client.list_tools()]
+        assert catalog.tools == listed
+
+    async def test_versions_differ_per_server(self):
+        versions = {(await tool_catalog(server)).version for server in (mcp, *SERVERS.values())}
+        assert len(versions) == 4
+
+    async def test_etag_revalidation(self):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://joi") as http:
+            resp = await http.get("/tools/jackett")
+            assert resp.status_code == 200
+            version = resp.json()["version"]
+            assert resp.headers["etag"] == f'"{version}"'
+            assert [t["name"] for t in resp.json()["tools"]] == [t.name for t in await SERVERS["jackett"].list_tools()]
+            unchanged = await http.get("/tools/jackett", headers={"If-None-Match": f'"{version}"'})
+            assert (unchanged.status_code, unchanged.content) == (304, b"")
+            stale = await http.get("/tools/jackett", headers={"If-None-Match": '"old"'})
+            assert stale.status_code == 200
+            assert (await http.get("/tools/nope")).status_code == 404
@@ -1,17 +1,25 @@
+import asyncio
+
 import pytest
 
+import joi_mcp.jackett as jk
 from joi_mcp.jackett import (
+    IndexerStats,
     TorrentDetail,
     TorrentSummary,
     _cache,
     _extract_torznab_attrs,
+    _indexer_stats,
     _make_id,
+    _parse_indexers,
     _parse_torznab_response,
+    _search_cache,
     get_torrent,
+    indexer_stats,
     search_torrents,
 )
 
-SAMPLE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+SAMPLE_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
 <rss version="2.0" xmlns:torznab="http://torznab.com/schemas/2015/feed">
   <channel>
     <title>Jackett</title>
@@ -32,7 +40,7 @@ SAMPLE_XML = """<?xml version="1.0" encoding="UTF-8"?>
   </channel>
 </rss>"""
 
-SINGLE_ITEM_XML = """<?xml version="1.0" encoding="UTF-8"?>
+SINGLE_ITEM_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
 <rss version="2.0" xmlns:torznab="http://torznab.com/schemas/2015/feed">
   <channel>
     <item>
@@ -44,14 +52,14 @@ SINGLE_ITEM_XML = """<?xml version="1.0" encoding="UTF-8"?>
   </channel>
 </rss>"""
 
-EMPTY_XML = """<?xml version="1.0" encoding="UTF-8"?>
+EMPTY_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
 <rss version="2.0" xmlns:torznab="http://torznab.com/schemas/2015/feed">
   <channel>
     <title>Jackett</title>
   </channel>
 </rss>"""
 
-ENCLOSURE_SIZE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+ENCLOSURE_SIZE_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
 <rss version="2.0" xmlns:torznab="http://torznab.com/schemas/2015/feed">
   <channel>
     <item>
@@ -126,7 +134,6 @@ class TestModels:
         assert result.publish_date is None
 
 
-
 @pytest.mark.unit
 class TestMakeId:
     def test_returns_prefixed_hash(self):
@@ -146,37 +153,27 @@ class TestMakeId:
 
 @pytest.mark.unit
 class TestExtractTorznabAttrs:
-    def test_extracts_single_attr_as_dict(self):
-        attrs = {"@name": "seeders", "@value": "100"}
-        result = _extract_torznab_attrs(attrs)
+    def test_extracts_single_attr(self):
+        result = _extract_torznab_attrs([("seeders", "100")])
         assert result["seeders"] == 100
 
     def test_extracts_multiple_attrs(self):
-        attrs = [
-            {"@name": "seeders", "@value": "100"},
-            {"@name": "peers", "@value": "50"},
-            {"@name": "size", "@value": "1024"},
-        ]
+        attrs = [("seeders", "100"), ("peers", "50"), ("size", "1024")]
         result = _extract_torznab_attrs(attrs)
         assert result["seeders"] == 100
         assert result["leechers"] == 50
         assert result["size"] == 1024
 
     def test_handles_multiple_categories(self):
-        attrs = [
-            {"@name": "category", "@value": "2000"},
-            {"@name": "category", "@value": "2010"},
-        ]
-        result = _extract_torznab_attrs(attrs)
+        result = _extract_torznab_attrs([("category", "2000"), ("category", "2010")])
         assert result["category"] == [2000, 2010]
 
-    def test_handles_none_attrs(self):
-        result = _extract_torznab_attrs(None)
+    def test_handles_no_attrs(self):
+        result = _extract_torznab_attrs([])
         assert result == {}
 
     def test_handles_empty_values(self):
-        attrs = [{"@name": "seeders", "@value": ""}]
-        result = _extract_torznab_attrs(attrs)
+        result = _extract_torznab_attrs([("seeders", "")])
         assert result["seeders"] == 0
 
 
@@ -222,6 +219,29 @@ class TestParseTorznabResponse:
         assert len(summaries) == 1
         assert summaries[0].size == 1073741824
 
+    def test_guid_with_attributes_and_missing_fields(self):
+        _cache.clear()
+        xml = b"""<rss><channel><item><title>No attrs</title><guid isPermaLink="true">g-1</guid></item></channel></rss>"""
+        summaries = _parse_torznab_response(xml)
+        assert summaries[0].id == _make_id("g-1")
+        detail = _cache[summaries[0].id]
+        assert (detail.size, detail.seeders, detail.indexer, detail.publish_date) == (0, 0, "", None)
+        assert detail.page_url == "g-1"
+
+    def test_declared_encoding_respected(self):
+        _cache.clear()
+        xml = (
+            '<?xml version="1.0" encoding="windows-1251"?>'
+            "<rss><channel><item><title>Интерстеллар</title><guid>g-2</guid></item></channel></rss>"
+        )
+        assert _parse_torznab_response(xml.encode("windows-1251"))[0].title == "Интерстеллар"
+
+    def test_multiple_items_keep_order(self):
+        _cache.clear()
+        xml = SAMPLE_XML.replace(b"</channel>", SECOND_ITEM_XML.split(b"<channel>")[1].split(b"</channel>")[0] + b"</channel>")
+        summaries = _parse_torznab_response(xml)
+        assert [s.title for s in summaries] == ["Ubuntu 24.04 LTS", "Interstellar RUS"]
+
 
 @pytest.mark.unit
 class TestGetTorrent:
@@ -240,7 +260,7 @@ class TestGetTorrent:
             get_torrent("nonexistent")
 
 
-SECOND_ITEM_XML = """<?xml version="1.0" encoding="UTF-8"?>
+SECOND_ITEM_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
 <rss version="2.0" xmlns:torznab="http://torznab.com/schemas/2015/feed">
   <channel>
     <item>
@@ -255,46 +275,304 @@ SECOND_ITEM_XML = """<?xml version="1.0" encoding="UTF-8"?>
 
 
 @pytest.mark.unit
+@pytest.mark.asyncio
 class TestAltQueriesDedup:
-    def test_dedup_by_id(self, monkeypatch):
+    async def test_dedup_by_id(self, monkeypatch):
         _cache.clear()
         call_count = 0
 
-        def fake_search(params):
+        async def fake_search(params):
             nonlocal call_count
             call_count += 1
-            if call_count == 1:
-                return _parse_torznab_response(SAMPLE_XML)
-            return _parse_torznab_response(SAMPLE_XML)  # same results
+            return _parse_torznab_response(SAMPLE_XML)  # same results for every query
 
         monkeypatch.setattr("joi_mcp.jackett._search", fake_search)
-        result = search_torrents(query="Ubuntu", alt_queries=["Убунту"])
+        result = await search_torrents(query="Ubuntu", alt_queries=["Убунту"])
         assert call_count == 2
         # Deduplicated: same GUID → same ID → kept once
         lines = result.data.strip().split("\n")
         assert len(lines) == 2  # header + 1 row
 
-    def test_alt_queries_merges_different_results(self, monkeypatch):
+    async def test_alt_queries_merges_different_results(self, monkeypatch):
         _cache.clear()
-        call_count = 0
 
-        def fake_search(params):
-            nonlocal call_count
-            call_count += 1
-            if call_count == 1:
-                return _parse_torznab_response(SAMPLE_XML)
-            return _parse_torznab_response(SECOND_ITEM_XML)
+        async def fake_search(params):
+            return _parse_torznab_response(SAMPLE_XML if params["q"] == "Interstellar" else SECOND_ITEM_XML)
 
         monkeypatch.setattr("joi_mcp.jackett._search", fake_search)
-        result = search_torrents(query="Interstellar", alt_queries=["Интерстеллар"])
+        result = await search_torrents(query="Interstellar", alt_queries=["Интерстеллар"])
         lines = result.data.strip().split("\n")
         assert len(lines) == 3  # header + 2 distinct rows
 
-    def test_returns_tsv_format(self, monkeypatch):
+    async def test_returns_tsv_format(self, monkeypatch):
         _cache.clear()
-        monkeypatch.setattr("joi_mcp.jackett._search", lambda p: _parse_torznab_response(SAMPLE_XML))
-        result = search_torrents(query="Ubuntu")
+
+        async def fake_search(params):
+            return _parse_torznab_response(SAMPLE_XML)
+
+        monkeypatch.setattr("joi_mcp.jackett._search", fake_search)
+        result = await search_torrents(query="Ubuntu")
         assert "\t" in result.data
         header = result.data.split("\n")[0]
         assert "title" in header
         assert "seeders" in header
+        assert result.timed_out == []
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestConcurrentQueries:
+    async def test_queries_run_concurrently(self, monkeypatch):
+        _cache.clear()
+        in_flight = 0
+        peak = 0
+
+        async def fake_search(params):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return []
+
+        monkeypatch.setattr("joi_mcp.jackett._search", fake_search)
+        monkeypatch.setattr("joi_mcp.jackett.settings.jackett_max_concurrency", 2)
+        await search_torrents(query="a", alt_queries=["b", "c", "d"])
+        assert peak == 2
+
+    async def test_slow_query_returns_partial_results(self, monkeypatch):
+        _cache.clear()
+
+        async def fake_search(params):
+            if params["q"] == "slow":
+                await asyncio.sleep(1)
+            return _parse_torznab_response(SAMPLE_XML)
+
+        monkeypatch.setattr("joi_mcp.jackett._search", fake_search)
+        monkeypatch.setattr("joi_mcp.jackett.settings.jackett_query_timeout", 0.05)
+        result = await search_torrents(query="Ubuntu", alt_queries=["slow"])
+        assert result.timed_out == ["slow"]
+        assert result.total == 1
+
+    async def test_non_timeout_errors_propagate(self, monkeypatch):
+        async def fake_search(params):
+            raise RuntimeError("jackett down")
+
+        monkeypatch.setattr("joi_mcp.jackett._search", fake_search)
+        with pytest.raises(RuntimeError, match="jackett down"):
+            await search_torrents(query="Ubuntu")
+
+
+INDEXERS_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<indexers>
+  <indexer id="rutracker" configured="true"><title>RuTracker</title></indexer>
+  <indexer id="1337x" configured="true"><title>1337x</title></indexer>
+  <indexer id="broken" configured="false"><title>Broken</title></indexer>
+</indexers>"""
+
+
+@pytest.mark.unit
+class TestParseIndexers:
+    def test_returns_configured_ids(self):
+        assert _parse_indexers(INDEXERS_XML) == ["rutracker", "1337x"]
+
+    def test_single_indexer(self):
+        xml = b'<indexers><indexer id="only" configured="true"><title>Only</title></indexer></indexers>'
+        assert _parse_indexers(xml) == ["only"]
+
+    def test_no_indexers(self):
+        assert _parse_indexers(b"<indexers/>") == []
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestPerIndexerSearch:
+    @pytest.fixture(autouse=True)
+    def per_indexer(self, monkeypatch):
+        _cache.clear()
+        _search_cache.clear()
+        _indexer_stats.clear()
+        monkeypatch.setattr("joi_mcp.jackett.settings.jackett_per_indexer", True)
+
+        async def fake_list():
+            return ["fast", "dupe", "slow", "broken"]
+
+        monkeypatch.setattr(jk, "_list_indexers", fake_list)
+        yield
+        _indexer_stats.clear()
+
+    @staticmethod
+    def _fake_indexers(monkeypatch, slow_delay=1.0):
+        async def fake_search_indexer(indexer, params):
+            if indexer == "slow":
+                await asyncio.sleep(slow_delay)
+            if indexer == "broken":
+                raise RuntimeError("indexer error")
+            return _parse_torznab_response(SECOND_ITEM_XML if indexer == "fast" else SAMPLE_XML)
+
+        monkeypatch.setattr(jk, "_search_indexer", fake_search_indexer)
+
+    async def test_merges_and_dedupes_across_indexers(self, monkeypatch):
+        self._fake_indexers(monkeypatch, slow_delay=0)
+        result = await search_torrents(query="Interstellar")
+        assert result.total == 2
+        assert _indexer_stats["broken"].errors == 1
+        assert _indexer_stats["fast"].errors == 0
+
+    async def test_deadline_returns_partial_and_records_timeout(self, monkeypatch):
+        self._fake_indexers(monkeypatch)
+        monkeypatch.setattr("joi_mcp.jackett.settings.jackett_indexer_deadline", 0.05)
+        result = await search_torrents(query="Interstellar")
+        assert result.total == 2
+        assert result.timed_out == []
+        assert _indexer_stats["slow"].consecutive_failures == 1
+
+    async def test_partial_results_not_cached(self, monkeypatch):
+        self._fake_indexers(monkeypatch)
+        monkeypatch.setattr("joi_mcp.jackett.settings.jackett_indexer_deadline", 0.05)
+        await search_torrents(query="Interstellar")
+        assert len(_search_cache) == 0
+
+    async def test_failed_indexer_results_not_cached(self, monkeypatch):
+        self._fake_indexers(monkeypatch, slow_delay=0)
+        await search_torrents(query="Interstellar")
+        assert len(_search_cache) == 0
+
+        async def healthy():
+            return ["fast", "slow"]
+
+        monkeypatch.setattr(jk, "_list_indexers", healthy)
+        await search_torrents(query="Interstellar")
+        assert len(_search_cache) == 1
+
+    async def test_cancelled_search_cancels_indexer_requests(self, monkeypatch):
+        started = asyncio.Event()
+        cancelled: list[str] = []
+
+        async def hanging(indexer, params):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(indexer)
+                raise
+
+        monkeypatch.setattr(jk, "_search_indexer", hanging)
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(jk._search_per_indexer({"q": "x"}), 0.05)
+        await asyncio.sleep(0)
+        assert started.is_set()
+        assert sorted(cancelled) == ["broken", "dupe", "fast", "slow"]
+        assert _indexer_stats == {}
+
+    async def test_failing_indexer_is_benched(self, monkeypatch):
+        self._fake_indexers(monkeypatch, slow_delay=0)
+        monkeypatch.setattr("joi_mcp.jackett.settings.jackett_indexer_max_failures", 2)
+        calls: list[str] = []
+        original = jk._search_indexer
+
+        async def counting(indexer, params):
+            calls.append(indexer)
+            return await original(indexer, params)
+
+        monkeypatch.setattr(jk, "_search_indexer", counting)
+        for _ in range(3):
+            _search_cache.clear()
+            await search_torrents(query="Interstellar")
+        assert calls.count("broken") == 2
+        assert calls.count("fast") == 3
+
+    async def test_indexers_launched_fastest_first(self, monkeypatch):
+        self._fake_indexers(monkeypatch, slow_delay=0)
+        for indexer, latency in {"fast": 0.1, "dupe": 2.0, "slow": 8.0}.items():
+            _indexer_stats[indexer] = IndexerStats(requests=1, avg_latency=latency)
+        calls: list[str] = []
+        original = jk._search_indexer
+
+        async def recording(indexer, params):
+            calls.append(indexer)
+            return await original(indexer, params)
+
+        monkeypatch.setattr(jk, "_search_indexer", recording)
+        await search_torrents(query="Interstellar")
+        assert calls == ["broken", "fast", "dupe", "slow"]  # unmeasured first
+        assert indexer_stats()["slow"].avg_latency < 8.0
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestSearchCache:
+    @pytest.fixture(autouse=True)
+    def fetch_calls(self, monkeypatch):
+        _cache.clear()
+        _search_cache.clear()
+        calls: list[str] = []
+
+        async def fake_fetch(params):
+            calls.append(params["q"])
+            return _parse_torznab_response(SAMPLE_XML), True
+
+        monkeypatch.setattr(jk, "_fetch", fake_fetch)
+        yield calls
+        _search_cache.clear()
+
+    async def test_repeated_search_served_from_cache(self, fetch_calls):
+        await search_torrents(query="Ubuntu")
+        hits = _search_cache.stats.hits
+        await search_torrents(query="  ubuntu ")
+        assert fetch_calls == ["Ubuntu"]
+        assert _search_cache.stats.hits == hits + 1
+
+    async def test_different_params_miss(self, fetch_calls):
+        await search_torrents(query="Ubuntu")
+        await search_torrents(query="Ubuntu", year=2024)
+        assert len(fetch_calls) == 2
+
+    async def test_evicted_details_force_refetch(self, fetch_calls):
+        await search_torrents(query="Ubuntu")
+        _cache._data.clear()
+        await search_torrents(query="Ubuntu")
+        assert len(fetch_calls) == 2
+        assert len(_cache) == 1
+
+    async def test_stale_entry_served_then_revalidated(self, fetch_calls, monkeypatch):
+        monkeypatch.setattr(_search_cache, "ttl", 0.0)
+        monkeypatch.setattr(_search_cache, "stale_ttl", 60.0)
+        await search_torrents(query="Ubuntu")
+        stale_hits = _search_cache.stats.stale_hits
+        result = await search_torrents(query="Ubuntu")
+        assert result.total == 1
+        assert _search_cache.stats.stale_hits == stale_hits + 1
+        await asyncio.sleep(0)
+        assert fetch_calls == ["Ubuntu", "Ubuntu"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestPrefetchLinks:
+    @pytest.fixture
+    def prefetched(self, monkeypatch):
+        _cache.clear()
+        urls: list[str] = []
+
+        async def fake_search(params):
+            return _parse_torznab_response(SAMPLE_XML) + _parse_torznab_response(SECOND_ITEM_XML)
+
+        monkeypatch.setattr("joi_mcp.jackett._search", fake_search)
+        monkeypatch.setattr("joi_mcp.jackett.prefetch_urls", lambda links: urls.extend(links))
+        return urls
+
+    async def test_disabled_by_default(self, prefetched):
+        await search_torrents(query="Interstellar")
+        assert prefetched == []
+
+    async def test_links_without_magnet_prefetched(self, prefetched, monkeypatch):
+        monkeypatch.setattr(jk.settings, "jackett_prefetch_links", 5)
+        await search_torrents(query="Interstellar")
+        # the first result carries a magneturl already
+        assert prefetched == ["https://example.com/download/rus.torrent"]
+
+    async def test_only_top_n(self, prefetched, monkeypatch):
+        monkeypatch.setattr(jk.settings, "jackett_prefetch_links", 1)
+        await search_torrents(query="Interstellar", sort_by="-seeders")
+        assert prefetched == []
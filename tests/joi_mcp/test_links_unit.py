@@ -0,0 +1,68 @@
+import httpx
+import pytest
+
+import joi_mcp.links as links
+from joi_mcp.links import prefetch_urls, resolve_url
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestResolveUrl:
+    @pytest.fixture
+    def responses(self):
+        """(routes, seen): routes maps url -> (status, location), status 0 = connection error; seen records requests."""
+        routes: dict[str, tuple[int, str | None]] = {}
+        seen: list[str] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(str(request.url))
+            status, location = routes[str(request.url)]
+            if status == 0:
+                raise httpx.ConnectError("Network error")
+            return httpx.Response(status, headers={"location": location} if location else {})
+
+        links._upstream.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return routes, seen
+
+    async def test_returns_magnet_unchanged(self):
+        magnet = "magnet:?xt=urn:btih:abc123"
+        assert await resolve_url(magnet) == magnet
+
+    @pytest.mark.parametrize("status", [301, 302])
+    async def test_follows_redirect_to_magnet(self, responses, status):
+        routes, _ = responses
+        routes["http://jackett/dl/123"] = (status, "magnet:?xt=urn:btih:xyz789")
+        assert await resolve_url("http://jackett/dl/123") == "magnet:?xt=urn:btih:xyz789"
+
+    async def test_returns_original_if_redirect_not_magnet(self, responses):
+        routes, _ = responses
+        routes["http://jackett/dl/789"] = (302, "http://example.com/file.torrent")
+        assert await resolve_url("http://jackett/dl/789") == "http://jackett/dl/789"
+
+    async def test_returns_original_if_200_ok(self, responses):
+        routes, _ = responses
+        routes["http://jackett/dl/torrent.torrent"] = (200, None)
+        assert await resolve_url("http://jackett/dl/torrent.torrent") == "http://jackett/dl/torrent.torrent"
+
+    async def test_returns_original_on_exception(self, responses):
+        routes, _ = responses
+        routes["http://jackett/dl/fail"] = (0, None)
+        assert await resolve_url("http://jackett/dl/fail") == "http://jackett/dl/fail"
+        assert "http://jackett/dl/fail" not in links._resolved
+
+    async def test_resolution_cached(self, responses):
+        routes, seen = responses
+        routes["http://jackett/dl/1"] = (302, "magnet:?xt=urn:btih:1")
+        routes["http://jackett/dl/2"] = (200, None)
+        for _ in range(2):
+            await resolve_url("http://jackett/dl/1")
+            await resolve_url("http://jackett/dl/2")
+        assert seen == ["http://jackett/dl/1", "http://jackett/dl/2"]
+
+    async def test_prefetch_shared_with_resolve(self, responses):
+        routes, seen = responses
+        routes["http://jackett/dl/1"] = (302, "magnet:?xt=urn:btih:1")
+        prefetch_urls(["http://jackett/dl/1", "magnet:?xt=urn:btih:2"])
+        assert await resolve_url("http://jackett/dl/1") == "magnet:?xt=urn:btih:1"
+        assert seen == ["http://jackett/dl/1"]
+        assert links._resolving == {}
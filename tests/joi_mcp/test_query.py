@@ -1,7 +1,18 @@
 import pytest
 from pydantic import BaseModel
 
-from joi_mcp.query import apply_query, project
+from joi_mcp.pagination import paginate
+from joi_mcp.query import (
+    _OPTIONS,
+    _compile_filter,
+    _haystack,
+    _is_false,
+    apply_query,
+    filter_fields,
+    project,
+    query_page,
+    to_tsv,
+)
 
 
 class Item(BaseModel):
@@ -121,6 +132,158 @@ class TestApplyQuery:
         assert result == []
 
 
+@pytest.mark.unit
+class TestQueryPage:
+    def _many(self) -> list[Item]:
+        return [Item(id=i, name=f"t{i}", status="seeding", progress=float(i * 7 % 10)) for i in range(40)]
+
+    @pytest.mark.parametrize("sort_by", [None, "progress", "-progress", "missing"])
+    @pytest.mark.parametrize("limit,offset", [(5, 0), (5, 10), (50, 0), (10, 35), (10, 100)])
+    def test_matches_apply_query_then_paginate(self, sort_by, limit, offset):
+        items = self._many()
+        expected = paginate(apply_query(items, "progress > `2`", sort_by), limit, offset)
+        assert query_page(items, "progress > `2`", sort_by, limit, offset) == expected
+
+    def test_top_k_keeps_ties_in_input_order(self):
+        page, _, _ = query_page(self._many(), sort_by="-progress", limit=3)
+        assert [(r.progress, r.id) for r in page] == [(9.0, 7), (9.0, 17), (9.0, 27)]
+
+    def test_total_counts_all_matches(self):
+        page, total, has_more = query_page(make_items(), "status=='downloading'", "-progress", limit=1)
+        assert [r.id for r in page] == [3]
+        assert total == 2
+        assert has_more is True
+
+    def test_empty(self):
+        assert query_page([], "progress > `1`", "progress") == ([], 0, False)
+
+
+@pytest.mark.unit
+class TestFilterCache:
+    def test_repeated_filter_hits_cache(self):
+        _compile_filter.cache_clear()
+        apply_query(make_items(), filter_expr="progress==100")
+        apply_query(make_items(), filter_expr="progress==100")
+        info = _compile_filter.cache_info()
+        assert info.misses == 1
+        assert info.hits == 1
+
+    def test_surrounding_whitespace_shares_entry(self):
+        _compile_filter.cache_clear()
+        apply_query(make_items(), filter_expr="status=='seeding'")
+        result = apply_query(make_items(), filter_expr="  status=='seeding' ")
+        assert _compile_filter.cache_info().currsize == 1
+        assert [r.id for r in result] == [2]
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+    status: str
+    progress: float
+    eta: int | None = None
+    private: bool = False
+    tags: list[str] = []
+
+
+def make_rows() -> list[Row]:
+    return [
+        Row(id=0, name="Ubuntu ISO", status="downloading", progress=0, eta=0, tags=["linux"]),
+        Row(id=1, name="Интерстеллар 2014", status="seeding", progress=100.0, eta=None, private=True),
+        Row(id=2, name="The.Matrix.1999", status="stopped", progress=1, eta=1, tags=["movie", "scifi"]),
+        Row(id=3, name="", status="seeding", progress=55.5, eta=-1),
+        Row(id=4, name="Arch Linux", status="check pending", progress=99.9, eta=3600, private=True, tags=[]),
+    ]
+
+
+DIFFERENTIAL_EXPRESSIONS = [
+    "progress==100",
+    "progress!=`100`",
+    "progress >= `55.5`",
+    "progress < `1`",
+    "eta > `0`",
+    "eta <= `0`",
+    "eta == null",
+    "eta == `1`",
+    "eta == `true`",
+    "private == `true`",
+    "private",
+    "!private",
+    "name",
+    "!name",
+    "tags",
+    "status=='seeding' && progress > `60`",
+    "status=='seeding' || private",
+    "!(status=='seeding') && eta",
+    "name > 'B'",
+    "contains(name, 'Linux')",
+    "contains(tags, 'movie')",
+    "starts_with(status, 'check')",
+    "search(@, 'matrix')",
+    "search(@, 'interstellar') || search(@, 'ubuntu')",
+    "search(@, 'linux') && !private",
+    "missing == null",
+    "[?status=='seeding']",
+]
+
+
+@pytest.mark.unit
+class TestFilterFields:
+    @pytest.mark.parametrize(
+        "expr,expected",
+        [
+            ("progress==`100`", {"progress"}),
+            ("progress == 100 && status=='seeding'", {"progress", "status"}),
+            ("!(eta) || contains(name, 'x')", {"eta", "name"}),
+            ("starts_with(name, 'Show') && total_size > `10`", {"name", "total_size"}),
+            ("search(@, 'matrix')", None),
+            ("@.name == 'x'", None),
+            ("[?progress==`100`].name", None),
+        ],
+    )
+    def test_referenced_fields(self, expr, expected):
+        assert filter_fields(expr) == expected
+
+
+@pytest.mark.unit
+class TestCompiledFilterEquivalence:
+    """Compiled predicates must select exactly what jmespath selects."""
+
+    @pytest.mark.parametrize("expr", DIFFERENTIAL_EXPRESSIONS)
+    def test_matches_jmespath(self, expr):
+        rows = make_rows()
+        parsed, predicate = _compile_filter(expr)
+        assert predicate is not None
+        expected = parsed.search([r.model_dump() for r in rows], options=_OPTIONS)
+        actual = [r.model_dump() for r in rows if not _is_false(predicate(vars(r)))]
+        assert actual == expected
+
+    @pytest.mark.parametrize("expr", DIFFERENTIAL_EXPRESSIONS)
+    def test_apply_query_matches_jmespath(self, expr):
+        rows = make_rows()
+        parsed, _ = _compile_filter(expr)
+        expected = parsed.search([r.model_dump() for r in rows], options=_OPTIONS)
+        assert [r.model_dump() for r in apply_query(rows, filter_expr=expr)] == expected
+
+    def test_unsupported_expression_falls_back(self):
+        _, predicate = _compile_filter("length(name) > `10`")
+        assert predicate is None
+        result = apply_query(make_rows(), filter_expr="length(name) > `10`")
+        assert {r.id for r in result} == {1, 2}
+
+    def test_projection_is_not_compiled(self):
+        _, predicate = _compile_filter("[?private].name")
+        assert predicate is None
+
+    @pytest.mark.parametrize("expr", ["contains(progress, '1')", "status < `5`"])
+    def test_runtime_type_mismatch_defers_to_jmespath(self, expr):
+        parsed, _ = _compile_filter(expr)
+        with pytest.raises(Exception) as expected:
+            parsed.search([r.model_dump() for r in make_rows()], options=_OPTIONS)
+        with pytest.raises(expected.type):
+            apply_query(make_rows(), filter_expr=expr)
+
+
 @pytest.mark.unit
 class TestSearchFunction:
     def test_search_case_insensitive(self):
@@ -214,6 +377,45 @@ class TestProject:
         assert set(result[0].keys()) == {"id", "name", "progress"}
 
 
+@pytest.mark.unit
+class TestToTsv:
+    def test_header_and_rows_in_model_field_order(self):
+        result = to_tsv(make_items()[:2])
+        lines = result.split("\n")
+        assert lines[0] == "id\tname\tstatus\tprogress\tfile_count\tcomment"
+        assert lines[1] == "1\tUbuntu ISO\tdownloading\t50.0\t1\t"
+        assert len(lines) == 3
+
+    def test_fields_project_with_id_included(self):
+        result = to_tsv(make_items(), fields=["progress", "name"])
+        lines = result.split("\n")
+        assert lines[0] == "id\tname\tprogress"
+        assert lines[2] == "2\tFedora ISO\t100.0"
+
+    def test_matches_project_then_dump(self):
+        items = make_items()
+        projected = project(items, fields=["status"])
+        assert to_tsv(items, fields=["status"]) == to_tsv(projected)
+
+    def test_escapes_tabs_and_newlines(self):
+        items = [Item(id=1, name="a\tb", status="x\ny", progress=0, comment="c\r")]
+        lines = to_tsv(items).split("\n")
+        assert len(lines) == 2
+        assert lines[1].split("\t") == ["1", "a\\tb", "x\\ny", "0.0", "0", "c\\r"]
+
+    def test_escapes_backslashes(self):
+        items = [Item(id=1, name="a\\tb", status="a\tb", progress=0, comment="C:\\x")]
+        cells = to_tsv(items).split("\n")[1].split("\t")
+        assert cells[1:3] == ["a\\\\tb", "a\\tb"]  # literal backslash-t and a real tab stay distinguishable
+        assert cells[5] == "C:\\\\x"
+
+    def test_dict_rows(self):
+        assert to_tsv([{"id": 1, "name": "x"}]) == "id\tname\n1\tx"
+
+    def test_empty(self):
+        assert to_tsv([]) == ""
+
+
 @pytest.mark.unit
 class TestSearchNormalized:
     """search() matches across transliteration, Cyrillic, dot-separated titles."""
@@ -245,6 +447,18 @@ class TestSearchNormalized:
         result = apply_query(self._items(), filter_expr="search(@, 'inception')")
         assert result == []
 
+    def test_match_does_not_span_fields(self):
+        items = [Item(id=1, name="Inter", status="stellar", progress=0)]
+        assert apply_query(items, filter_expr="search(@, 'interstellar')") == []
+
+    def test_haystack_reused_across_queries(self):
+        _haystack.cache_clear()
+        apply_query(self._items(), filter_expr="search(@, 'interstellar')")
+        apply_query(self._items(), filter_expr="search(@, '2014')")
+        info = _haystack.cache_info()
+        assert info.misses == 4
+        assert info.hits == 4
+
 
 @pytest.mark.unit
 class TestIndexKeyField:
@@ -1,6 +1,23 @@
+import asyncio
+import time
+
+import httpx
 import pytest
 
-from joi_mcp.tmdb import Genre, GenreList, MediaItem, MediaList, Movie, MovieList, TvShow, _movie_to_media, _tv_to_media
+import joi_mcp.tmdb as tm
+from joi_mcp.tmdb import (
+    Genre,
+    GenreList,
+    MediaItem,
+    MediaList,
+    Movie,
+    MovieList,
+    TvShow,
+    _movie_to_media,
+    _tv_to_media,
+    discover_movies,
+    search_media,
+)
 
 
 @pytest.mark.unit
@@ -138,3 +155,345 @@ class TestMediaConversion:
         alt = {"RU": "Во все тяжкие"}
         item = _tv_to_media(tv, alt)
         assert item.alt_titles == alt
+
+
+class FakeTmdb:
+    """Stands in for tmdb._request: canned payloads per path, slow alternative_titles that record concurrency."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls: list[str] = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, path: str, params: dict):
+        self.calls.append(path)
+        if path.startswith("/find/"):
+            return {
+                "movie_results": [{"id": i, "title": f"Movie {i}"} for i in range(1, 5)],
+                "tv_results": [{"id": 100, "name": "Show"}],
+            }
+        if path == "/search/movie":
+            return {"results": [{"id": 7, "title": "Query Movie"}]}
+        if path == "/search/tv":
+            return {"results": [{"id": 200, "name": "Query Show"}]}
+        media_type, tmdb_id, _ = path.strip("/").split("/")
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        key = "titles" if media_type == "movie" else "results"
+        return {key: [{"iso_3166_1": "RU", "title": f"ru-{tmdb_id}"}]}
+
+    def alt_title_calls(self) -> list[str]:
+        return [c for c in self.calls if c.endswith("/alternative_titles")]
+
+
+@pytest.mark.unit
+class TestAltTitles:
+    @pytest.fixture(autouse=True)
+    def fake(self, mocker):
+        fake = FakeTmdb()
+        mocker.patch("joi_mcp.tmdb._request", new=fake)
+        return fake
+
+    @pytest.mark.asyncio
+    async def test_imdb_lookup_fetches_alt_titles_concurrently(self, fake):
+        result = await search_media(imdb_id="tt0133093")
+        assert [r.alt_titles for r in result.results] == [{"RU": f"ru-{i}"} for i in (1, 2, 3, 4, 100)]
+        assert sorted(fake.alt_title_calls()) == sorted(
+            [f"/movie/{i}/alternative_titles" for i in (1, 2, 3, 4)] + ["/tv/100/alternative_titles"]
+        )
+        assert fake.peak > 1
+
+    @pytest.mark.asyncio
+    async def test_alt_titles_served_from_cache(self, fake):
+        await search_media(imdb_id="tt0133093")
+        await search_media(imdb_id="tt0133093")
+        assert len(fake.alt_title_calls()) == 5
+
+    @pytest.mark.asyncio
+    async def test_query_results_not_enriched_by_default(self, fake):
+        result = await search_media(query="anything")
+        assert all(r.alt_titles is None for r in result.results)
+        assert fake.alt_title_calls() == []
+
+    @pytest.mark.asyncio
+    async def test_query_results_enriched_when_enabled(self, fake, monkeypatch):
+        monkeypatch.setattr("joi_mcp.tmdb.settings.tmdb_query_alt_titles", True)
+        result = await search_media(query="anything", limit=1)
+        assert result.total == 2
+        assert result.results[0].alt_titles == {"RU": "ru-7"}
+        assert fake.alt_title_calls() == ["/movie/7/alternative_titles"]
+
+
+@pytest.mark.unit
+class TestSearchMedia:
+    MOVIES = [{"id": 1, "title": "M1", "popularity": 5.0}, {"id": 2, "title": "M2", "popularity": 50.0}]
+    SHOWS = [{"id": 10, "name": "T1", "popularity": 20.0}, {"id": 11, "name": "T2", "popularity": 5.0}]
+
+    @pytest.fixture
+    def requests(self, mocker):
+        calls: list[tuple[str, float]] = []
+
+        async def fake(path: str, params: dict):
+            calls.append((path, time.monotonic()))
+            await asyncio.sleep(0.05)
+            return {"results": self.MOVIES if path == "/search/movie" else self.SHOWS}
+
+        mocker.patch("joi_mcp.tmdb._request", new=fake)
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_movie_and_tv_searched_concurrently(self, requests):
+        start = time.monotonic()
+        await search_media(query="x")
+        assert sorted(path for path, _ in requests) == ["/search/movie", "/search/tv"]
+        assert time.monotonic() - start < 0.09
+
+    @pytest.mark.asyncio
+    async def test_media_type_searches_one_endpoint(self, requests):
+        result = await search_media(query="x", media_type="tv")
+        assert [path for path, _ in requests] == ["/search/tv"]
+        assert [r.id for r in result.results] == [10, 11]
+
+    @pytest.mark.asyncio
+    async def test_default_merge_movies_then_tv(self, requests):
+        result = await search_media(query="x")
+        assert [r.id for r in result.results] == [1, 2, 10, 11]
+
+    @pytest.mark.asyncio
+    async def test_interleave_by_popularity(self, requests, monkeypatch):
+        monkeypatch.setattr("joi_mcp.tmdb.settings.tmdb_interleave_results", True)
+        result = await search_media(query="x")
+        # each list keeps its relevance order; the more popular head goes first, ties favour movies
+        assert [r.id for r in result.results] == [10, 1, 2, 11]
+
+
+@pytest.mark.unit
+class TestDiscoverPaging:
+    TOTAL = 95  # 5 TMDB pages, the last one holding 15
+
+    @pytest.fixture
+    def pages(self, mocker):
+        requested: list[int] = []
+
+        async def fake(path: str, params: dict):
+            page = params["page"]
+            requested.append(page)
+            await asyncio.sleep(0.05)
+            count = min(tm.PAGE_SIZE, self.TOTAL - (page - 1) * tm.PAGE_SIZE)
+            results = [
+                {"id": (page - 1) * tm.PAGE_SIZE + i, "title": f"M{i}", "vote_average": float((page * 7 + i) % 10)}
+                for i in range(max(count, 0))
+            ]
+            return {"page": page, "results": results, "total_results": self.TOTAL, "total_pages": 5}
+
+        mocker.patch("joi_mcp.tmdb._request", new=fake)
+        return requested
+
+    async def _settle(self):
+        await asyncio.gather(*tm._prefetching.values())
+
+    @pytest.mark.asyncio
+    async def test_window_maps_onto_pages(self, pages):
+        start = time.monotonic()
+        result = await discover_movies(source="genre", genre_id=878, limit=25, offset=30)
+        assert time.monotonic() - start < 0.09  # pages 2 and 3 fetched concurrently
+        assert [m.id for m in result.movies] == list(range(30, 55))
+        assert (result.total, result.has_more) == (self.TOTAL, True)
+        assert sorted(pages[:2]) == [2, 3]
+
+    @pytest.mark.asyncio
+    async def test_next_page_prefetched_and_cached(self, pages):
+        await discover_movies(source="similar", movie_id=603, limit=20)
+        await self._settle()
+        assert pages == [1, 2]
+        result = await discover_movies(source="similar", movie_id=603, limit=20, offset=20)
+        await self._settle()
+        assert [m.id for m in result.movies] == list(range(20, 40))
+        assert pages == [1, 2, 3]  # page 2 from cache, page 3 prefetched
+
+    @pytest.mark.asyncio
+    async def test_last_page(self, pages):
+        result = await discover_movies(source="genre", genre_id=878, limit=50, offset=80)
+        await self._settle()
+        assert [m.id for m in result.movies] == list(range(80, 95))
+        assert (result.total, result.has_more) == (self.TOTAL, False)
+        assert sorted(pages) == [5, 6, 7]  # total_pages is unknown up front; pages past it come back empty
+
+    @pytest.mark.asyncio
+    async def test_sort_covers_every_page(self, pages):
+        result = await discover_movies(source="genre", genre_id=878, sort_by="-vote_average", limit=10, offset=15)
+        await self._settle()
+        assert pages[0] == 1 and sorted(pages[1:]) == [2, 3, 4, 5]  # page 1 first for total_pages, the rest concurrently
+        ranked = sorted(range(self.TOTAL), key=lambda i: -float((((i // 20) + 1) * 7 + i % 20) % 10))
+        assert [m.id for m in result.movies] == ranked[15:25]
+        assert (result.total, result.has_more) == (self.TOTAL, True)
+
+    @pytest.mark.asyncio
+    async def test_sort_capped_by_max_pages(self, pages, monkeypatch):
+        monkeypatch.setattr("joi_mcp.tmdb.settings.tmdb_max_pages", 2)
+        result = await discover_movies(source="genre", genre_id=878, sort_by="-vote_average", limit=50)
+        await self._settle()
+        assert pages == [1, 2, 3]  # page 3 prefetched
+        assert len(result.movies) == 40
+        assert result.has_more
+
+    @pytest.mark.asyncio
+    async def test_max_pages_per_call(self, pages, monkeypatch):
+        monkeypatch.setattr("joi_mcp.tmdb.settings.tmdb_max_pages", 2)
+        result = await discover_movies(source="genre", genre_id=878, limit=80)
+        await self._settle()
+        assert len(result.movies) == 40
+        assert result.has_more
+        assert pages == [1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_beyond_last_tmdb_page(self, pages):
+        result = await discover_movies(source="genre", genre_id=878, offset=tm.MAX_PAGE * tm.PAGE_SIZE)
+        assert (result.movies, result.total, result.has_more) == ([], 0, False)
+        assert pages == []
+
+
+def _mock_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url=tm.TMDB_URL, transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.unit
+class TestGet:
+    @pytest.fixture(autouse=True)
+    def reset_backoff(self, monkeypatch):
+        monkeypatch.setattr(tm, "_retry_at", 0.0)
+
+    @pytest.mark.asyncio
+    async def test_sends_api_key_and_drops_none_params(self, monkeypatch):
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request.url)
+            return httpx.Response(200, json={"ok": True})
+
+        monkeypatch.setattr(tm.settings, "tmdb_api_key", "k")
+        tm._upstream.client = _mock_client(handler)
+        assert await tm._get("/search/movie", query="Matrix", year=None) == {"ok": True}
+        assert seen[0].path == "/3/search/movie"
+        assert dict(seen[0].params) == {"api_key": "k", "query": "Matrix"}
+
+    @pytest.mark.asyncio
+    async def test_retries_429_after_retry_after(self):
+        statuses = iter([429, 429, 200])
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            status = next(statuses)
+            return httpx.Response(status, headers={"Retry-After": "0.05"}, json={"page": 1})
+
+        tm._upstream.client = _mock_client(handler)
+        start = time.monotonic()
+        assert await tm._request("/genre/movie/list", {}) == {"page": 1}
+        assert time.monotonic() - start >= 0.1
+
+    @pytest.mark.asyncio
+    async def test_429_backs_off_concurrent_callers(self):
+        times: list[float] = []
+        limited = [True]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            times.append(time.monotonic())
+            if limited[0]:
+                limited[0] = False
+                return httpx.Response(429, headers={"Retry-After": "0.1"})
+            return httpx.Response(200, json={})
+
+        async def second():
+            await asyncio.sleep(0.02)
+            await tm._request("/b", {})
+
+        tm._upstream.client = _mock_client(handler)
+        await asyncio.gather(tm._request("/a", {}), second())
+        assert times[1] - times[0] >= 0.1
+        assert times[2] - times[0] >= 0.1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, monkeypatch):
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(429, headers={"Retry-After": "0"})
+
+        monkeypatch.setattr(tm.settings, "tmdb_max_retries", 2)
+        tm._upstream.client = _mock_client(handler)
+        with pytest.raises(httpx.HTTPStatusError):
+            await tm._request("/genre/movie/list", {})
+        assert len(calls) == 3
+
+    def test_retry_after_falls_back_to_exponential_backoff(self):
+        assert tm._retry_after(httpx.Response(429), 2) == 4.0
+        assert tm._retry_after(httpx.Response(429, headers={"Retry-After": "999"}), 0) == tm.MAX_RETRY_AFTER
+
+
+@pytest.mark.unit
+class TestResponseCache:
+    @pytest.fixture
+    def requests(self, mocker):
+        calls = []
+
+        async def fake(path: str, params: dict):
+            calls.append((path, params))
+            return {"path": path, "n": len(calls)}
+
+        mocker.patch("joi_mcp.tmdb._request", new=fake)
+        return calls
+
+    @pytest.mark.parametrize(
+        "path,kind",
+        [
+            ("/genre/movie/list", "genre"),
+            ("/find/tt0133093", "find"),
+            ("/search/movie", "search"),
+            ("/discover/movie", "discover"),
+            ("/movie/603/similar_movies", "details"),
+            ("/tv/1396/alternative_titles", "details"),
+        ],
+    )
+    def test_endpoint_kind(self, path, kind):
+        assert tm._endpoint(path) == kind
+
+    def test_ttl_per_endpoint_from_settings(self):
+        assert tm._caches["genre"].ttl == tm.settings.tmdb_genre_ttl
+        assert tm._caches["search"].ttl == tm.settings.tmdb_search_ttl
+        assert tm._caches["details"].ttl == tm.settings.tmdb_details_ttl
+
+    @pytest.mark.asyncio
+    async def test_repeat_call_served_locally(self, requests):
+        before = tm.cache_stats()["details"].model_copy()
+        first = await tm._get("/movie/603/similar_movies")
+        second = await tm._get("/movie/603/similar_movies")
+        assert first == second
+        assert len(requests) == 1
+        stats = tm.cache_stats()["details"]
+        assert (stats.hits - before.hits, stats.misses - before.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_key_ignores_param_order_and_none(self, requests):
+        await tm._get("/search/movie", query="Matrix", year=1999, page=None)
+        await tm._get("/search/movie", year=1999, query="Matrix")
+        assert requests == [("/search/movie", {"query": "Matrix", "year": 1999})]
+
+    @pytest.mark.asyncio
+    async def test_distinct_params_are_distinct_entries(self, requests):
+        await tm._get("/discover/movie", with_genres=28, page=1)
+        await tm._get("/discover/movie", with_genres=28, page=2)
+        assert len(requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_refetched(self, requests, mocker):
+        now = time.time()
+        mocker.patch("joi_mcp.cache.time.time", return_value=now)
+        await tm._get("/search/tv", query="x")
+        await tm._get("/genre/movie/list")
+        mocker.patch("joi_mcp.cache.time.time", return_value=now + tm.settings.tmdb_search_ttl + 1)
+        await tm._get("/search/tv", query="x")
+        await tm._get("/genre/movie/list")
+        assert [path for path, _ in requests] == ["/search/tv", "/genre/movie/list", "/search/tv"]
@@ -1,18 +1,30 @@
+import asyncio
+import json
+import time
 from datetime import timedelta
 from enum import Enum
+from typing import Any
 from unittest.mock import MagicMock
 
+import httpx
 import pytest
+import transmission_rpc
+from transmission_rpc.error import TransmissionError
 
+import joi_mcp.transmission as tm
 from joi_mcp.transmission import (
+    FileTree,
     FolderEntry,
     Torrent,
     TorrentFile,
     TorrentFileList,
     TorrentList,
-    _aggregate_by_depth,
-    _resolve_url,
+    _needed_fields,
+    _priority_arguments,
+    _rpc_fields,
+    _sync_torrents,
     _torrent_to_model,
+    list_torrents,
 )
 
 
@@ -61,6 +73,60 @@ def make_fake_torrent(
     return t
 
 
+def rpc_fields(id: int, **overrides) -> dict:
+    fields = {
+        "id": id,
+        "hashString": f"{id:040x}",
+        "name": f"Torrent {id}",
+        "status": 4,
+        "percentDone": 0.5,
+        "eta": 60,
+        "totalSize": 1000,
+        "comment": "",
+        "errorString": "",
+        "rateDownload": 10,
+        "rateUpload": 0,
+        "file-count": 1,
+    }
+    return fields | overrides
+
+
+def rpc_torrents(*ids: int, **overrides) -> list[transmission_rpc.Torrent]:
+    return [transmission_rpc.Torrent(fields=rpc_fields(i, **overrides)) for i in ids]
+
+
+class FakeRpc:
+    """Stands in for transmission._rpc: answers session-get and torrent-get from in-memory torrents."""
+
+    def __init__(self, *ids: int, rpc_version: int = 17):
+        self.torrents = {i: rpc_fields(i) for i in ids}
+        self.rpc_version = rpc_version
+        self.active: list[dict] = []
+        self.removed: list[int] = []
+        self.calls: list[tuple[str, dict]] = []
+
+    async def __call__(self, method: str, arguments: dict | None = None) -> dict:
+        arguments = arguments or {}
+        self.calls.append((method, arguments))
+        if method == "session-get":
+            return {"rpc-version": self.rpc_version}
+        if method != "torrent-get":
+            return {}
+        ids = arguments.get("ids")
+        if ids == "recently-active":
+            rows, removed = self.active, self.removed
+        else:
+            rows, removed = [t for i, t in self.torrents.items() if ids is None or i in ids], None
+        result = {"torrents": [{k: v for k, v in t.items() if k in arguments["fields"]} for t in rows]}
+        return result if removed is None else result | {"removed": removed}
+
+    def gets(self, ids=None) -> list[dict]:
+        return [args for method, args in self.calls if method == "torrent-get" and args.get("ids") == ids]
+
+    def requested(self) -> list[str]:
+        return self.gets()[-1]["fields"]
+
+
 @pytest.mark.unit
 class TestModels:
     def test_torrent_file_model(self):
@@ -216,23 +282,33 @@ class TestModels:
 
 
 @pytest.mark.unit
-class TestAggregateByDepth:
-    def test_depth_zero_returns_all_files(self):
+class TestFileTree:
+    def test_depth_none_returns_all_files(self):
         files = [
             TorrentFile(index=0, name="Show/S01/E01.mkv", size=100, completed=100, priority=1),
             TorrentFile(index=1, name="Show/S01/E02.mkv", size=100, completed=50, priority=1),
         ]
-        result = _aggregate_by_depth(files, 0)
+        result = FileTree.build("h", files).entries()
         assert len(result) == 2
         assert all(isinstance(f, TorrentFile) for f in result)
 
+    @pytest.mark.parametrize("depth", [0, -1])
+    def test_depth_below_one_returns_all_files(self, depth):
+        files = [
+            TorrentFile(index=0, name="Show/S01/E01.mkv", size=100, completed=100, priority=1),
+            TorrentFile(index=1, name="readme.txt", size=10, completed=10, priority=1),
+        ]
+        result = FileTree.build("h", files).entries(depth=depth)
+        assert [f.index for f in result] == [0, 1]
+        assert all(isinstance(f, TorrentFile) for f in result)
+
     def test_depth_one_aggregates_top_level(self):
         files = [
             TorrentFile(index=0, name="Show/S01/E01.mkv", size=100, completed=100, priority=1),
             TorrentFile(index=1, name="Show/S01/E02.mkv", size=200, completed=50, priority=1),
             TorrentFile(index=2, name="readme.txt", size=10, completed=10, priority=1),
         ]
-        result = _aggregate_by_depth(files, 1)
+        result = FileTree.build("h", files).entries(depth=1)
         # readme.txt at depth 1 stays as file, Show folder gets aggregated
         assert len(result) == 2
         files_only = [f for f in result if isinstance(f, TorrentFile)]
@@ -251,7 +327,7 @@ class TestAggregateByDepth:
             TorrentFile(index=1, name="Show/S01/E02.mkv", size=200, completed=50, priority=1),
             TorrentFile(index=2, name="Show/S02/E01.mkv", size=150, completed=75, priority=1),
         ]
-        result = _aggregate_by_depth(files, 2)
+        result = FileTree.build("h", files).entries(depth=2)
         # All files have 3 parts, so all get aggregated at depth 2
         folders = [f for f in result if isinstance(f, FolderEntry)]
         assert len(folders) == 2
@@ -264,7 +340,7 @@ class TestAggregateByDepth:
             TorrentFile(index=1, name="Extras/making.mkv", size=500, completed=500, priority=1),
             TorrentFile(index=2, name="Extras/deleted.mkv", size=300, completed=150, priority=1),
         ]
-        result = _aggregate_by_depth(files, 1)
+        result = FileTree.build("h", files).entries(depth=1)
         files_only = [f for f in result if isinstance(f, TorrentFile)]
         folders = [f for f in result if isinstance(f, FolderEntry)]
         assert len(files_only) == 1
@@ -273,6 +349,29 @@ class TestAggregateByDepth:
         assert folders[0].name == "Extras"
         assert folders[0].file_count == 2
 
+    def test_folder_contents(self):
+        files = [
+            TorrentFile(index=0, name="Show/S01/E01.mkv", size=100, completed=100, priority=1),
+            TorrentFile(index=1, name="Show/S02/Extras/a.mkv", size=200, completed=0, priority=1),
+            TorrentFile(index=2, name="Show/S02/E01.mkv", size=150, completed=75, priority=1),
+        ]
+        tree = FileTree.build("h", files)
+        result = tree.entries("Show/S02/", depth=1)
+        assert [(e.name, type(e)) for e in result] == [("Show/S02/E01.mkv", TorrentFile), ("Show/S02/Extras", FolderEntry)]
+        assert [f.index for f in tree.entries("Show", depth=None)] == [0, 1, 2]
+        with pytest.raises(ValueError, match="Folder Show/S03 not found"):
+            tree.entries("Show/S03")
+
+    def test_update_propagates_progress_to_ancestors(self):
+        files = [
+            TorrentFile(index=0, name="Show/S01/E01.mkv", size=100, completed=0, priority=0),
+            TorrentFile(index=1, name="Show/S02/E01.mkv", size=100, completed=0, priority=0),
+        ]
+        tree = FileTree.build("h", files)
+        tree.update([{"bytesCompleted": 40, "priority": 1, "wanted": True}, {"bytesCompleted": 0, "priority": 0, "wanted": True}])
+        assert (tree.root.completed_size, tree.folder("Show").completed_size, tree.folder("Show/S02").completed_size) == (40, 40, 0)
+        assert tree.entries("Show/S01")[0].priority == 1
+
 
 @pytest.mark.unit
 class TestTorrentToModel:
@@ -356,6 +455,10 @@ class TestTorrentToModel:
         result = _torrent_to_model(fake)
         assert result.file_count == 0
 
+    def test_file_count_from_rpc_field(self):
+        t = transmission_rpc.Torrent(fields=rpc_fields(7, **{"file-count": 12}))
+        assert _torrent_to_model(t).file_count == 12
+
     def test_handles_multiple_files(self):
         files = [
             FakeFile(name="video.mkv", size=1000, completed=1000, priority=1),
@@ -367,49 +470,434 @@ class TestTorrentToModel:
 
 
 @pytest.mark.unit
-class TestResolveUrl:
-    def test_returns_magnet_unchanged(self):
-        magnet = "magnet:?xt=urn:btih:abc123"
-        assert _resolve_url(magnet) == magnet
-
-    def test_follows_302_redirect_to_magnet(self, mocker):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 302
-        mock_resp.headers = {"location": "magnet:?xt=urn:btih:xyz789"}
-        mocker.patch("httpx.get", return_value=mock_resp)
-
-        result = _resolve_url("http://jackett/dl/123")
-        assert result == "magnet:?xt=urn:btih:xyz789"
-
-    def test_follows_301_redirect_to_magnet(self, mocker):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 301
-        mock_resp.headers = {"location": "magnet:?xt=urn:btih:abc"}
-        mocker.patch("httpx.get", return_value=mock_resp)
-
-        result = _resolve_url("http://jackett/dl/456")
-        assert result == "magnet:?xt=urn:btih:abc"
-
-    def test_returns_original_if_redirect_not_magnet(self, mocker):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 302
-        mock_resp.headers = {"location": "http://example.com/file.torrent"}
-        mocker.patch("httpx.get", return_value=mock_resp)
-
-        result = _resolve_url("http://jackett/dl/789")
-        assert result == "http://jackett/dl/789"
-
-    def test_returns_original_if_200_ok(self, mocker):
-        mock_resp = MagicMock()
-        mock_resp.status_code = 200
-        mock_resp.headers = {}
-        mocker.patch("httpx.get", return_value=mock_resp)
-
-        result = _resolve_url("http://jackett/dl/torrent.torrent")
-        assert result == "http://jackett/dl/torrent.torrent"
-
-    def test_returns_original_on_exception(self, mocker):
-        mocker.patch("httpx.head", side_effect=Exception("Network error"))
-
-        result = _resolve_url("http://jackett/dl/fail")
-        assert result == "http://jackett/dl/fail"
+class TestTorrentMirror:
+    @pytest.fixture
+    def rpc(self, mocker):
+        rpc = FakeRpc(1, 2, 3)
+        mocker.patch("joi_mcp.transmission._rpc", new=rpc)
+        return rpc
+
+    @pytest.fixture
+    def clock(self, mocker):
+        now = [1000.0]
+        mocker.patch("joi_mcp.transmission.time.monotonic", side_effect=lambda: now[0])
+        return now
+
+    @pytest.mark.asyncio
+    async def test_first_read_is_full_sync_with_explicit_fields(self, rpc, clock):
+        assert [t.id for t in await _sync_torrents()] == [1, 2, 3]
+        fields = rpc.requested()
+        assert "file-count" in fields and "files" not in fields
+        assert {"name", "percentDone", "totalSize", "rateDownload"} <= set(fields)
+
+    @pytest.mark.asyncio
+    async def test_old_daemon_requests_files_for_count(self, rpc, clock):
+        rpc.rpc_version = 16
+        await _sync_torrents()
+        fields = rpc.requested()
+        assert "files" in fields and "file-count" not in fields
+
+    @pytest.mark.asyncio
+    async def test_rpc_version_fetched_once(self, rpc, clock):
+        await _sync_torrents()
+        clock[0] += tm.RECENTLY_ACTIVE_WINDOW + 1
+        await _sync_torrents()
+        assert [method for method, _ in rpc.calls].count("session-get") == 1
+
+    @pytest.mark.asyncio
+    async def test_served_from_mirror_within_max_age(self, rpc, clock):
+        await _sync_torrents()
+        clock[0] += tm.settings.transmission_mirror_max_age / 2
+        await _sync_torrents()
+        assert len(rpc.gets()) == 1
+        assert rpc.gets("recently-active") == []
+
+    @pytest.mark.asyncio
+    async def test_delta_sync_applies_changes_and_removals(self, rpc, clock):
+        await _sync_torrents()
+        rpc.active = [rpc_fields(2, percentDone=1.0), rpc_fields(4)]
+        rpc.removed = [3]
+        clock[0] += tm.settings.transmission_mirror_max_age + 1
+        torrents = {t.id: t for t in await _sync_torrents()}
+        assert sorted(torrents) == [1, 2, 4]
+        assert torrents[2].progress == 100.0
+        assert len(rpc.gets()) == 1
+
+    @pytest.mark.asyncio
+    async def test_full_sync_once_outside_recently_active_window(self, rpc, clock):
+        await _sync_torrents()
+        clock[0] += tm.RECENTLY_ACTIVE_WINDOW + 1
+        del rpc.torrents[2], rpc.torrents[3]
+        assert [t.id for t in await _sync_torrents()] == [1]
+        assert len(rpc.gets()) == 2
+        assert rpc.gets("recently-active") == []
+
+    @pytest.mark.asyncio
+    async def test_periodic_full_sync(self, rpc, clock, monkeypatch):
+        monkeypatch.setattr(tm.settings, "transmission_full_sync_interval", 30.0)
+        await _sync_torrents()
+        for _ in range(3):
+            clock[0] += 11
+            await _sync_torrents()
+        assert len(rpc.gets("recently-active")) == 2
+        assert len(rpc.gets()) == 2
+
+    @pytest.mark.asyncio
+    async def test_mutation_forces_delta_sync(self, rpc, clock):
+        await _sync_torrents()
+        await tm.pause_torrent(1)
+        assert ("torrent-stop", {"ids": [1]}) in rpc.calls
+        rpc.active = [rpc_fields(1, status=0)]
+        torrents = {t.id: t for t in await _sync_torrents()}
+        assert torrents[1].status == "stopped"
+
+    @pytest.mark.asyncio
+    async def test_list_torrents_uses_mirror(self, rpc, clock):
+        await list_torrents()
+        result = await list_torrents(filter_expr="id==`2`")
+        assert result.total == 1
+        assert len(rpc.gets()) == 1
+
+
+@pytest.mark.unit
+class TestFieldSelectiveRpc:
+    ALL = set(Torrent.model_fields)
+
+    @pytest.fixture
+    def rpc(self, mocker):
+        rpc = FakeRpc(1, 2)
+        mocker.patch("joi_mcp.transmission._rpc", new=rpc)
+        return rpc
+
+    @pytest.mark.parametrize(
+        "fields,filter_expr,sort_by,expected",
+        [
+            (None, None, None, ALL),
+            (["name", "total_size"], None, None, {"id", "name", "total_size"}),
+            (["name"], "progress==`100`", "-download_speed", {"id", "name", "progress", "download_speed"}),
+            (["name"], "search(@, 'x')", None, ALL),
+            (["name", "bogus"], "missing == null", None, {"id", "name"}),
+        ],
+    )
+    def test_needed_fields(self, fields, filter_expr, sort_by, expected):
+        assert _needed_fields(fields, filter_expr, sort_by) == expected
+
+    def test_rpc_fields(self):
+        assert _rpc_fields(17, {"id", "progress", "file_count"}) == ["file-count", "id", "percentDone"]
+        assert _rpc_fields(16, {"id", "file_count"}) == ["files", "id"]
+
+    @pytest.mark.asyncio
+    async def test_projection_requests_only_its_columns(self, rpc):
+        result = await list_torrents(fields=["name", "total_size"])
+        assert rpc.requested() == ["id", "name", "totalSize"]
+        assert result.data.splitlines() == ["id\tname\ttotal_size", "1\tTorrent 1\t1000", "2\tTorrent 2\t1000"]
+
+    @pytest.mark.asyncio
+    async def test_filter_and_sort_fields_requested(self, rpc):
+        result = await list_torrents(fields=["name"], filter_expr="progress==`50`", sort_by="-id")
+        assert rpc.requested() == ["id", "name", "percentDone"]
+        assert result.data.splitlines() == ["id\tname", "2\tTorrent 2", "1\tTorrent 1"]
+
+    @pytest.mark.asyncio
+    async def test_mirror_grows_with_requested_fields(self, rpc):
+        await list_torrents(fields=["name"])
+        await list_torrents(fields=["name"])
+        assert len(rpc.gets()) == 1
+        result = await list_torrents()
+        assert len(rpc.gets()) == 2
+        assert "percentDone" in rpc.requested() and "file-count" in rpc.requested()
+        assert result.data.splitlines()[0].split("\t") == list(Torrent.model_fields)
+        await list_torrents(fields=["name"])
+        assert len(rpc.gets()) == 2
+
+    def test_partial_model_and_full_model(self):
+        t = rpc_torrents(3)[0]
+        partial = _torrent_to_model(t, {"id", "name"})
+        assert vars(partial) == {"id": 3, "name": "Torrent 3"}
+        assert _torrent_to_model(t, set(Torrent.model_fields)) == _torrent_to_model(t)
+
+
+@pytest.mark.unit
+class TestTools:
+    @pytest.fixture
+    def rpc(self, mocker):
+        rpc = FakeRpc(1)
+        rpc.torrents[1]["files"] = [
+            {"name": "Show/E01.mkv", "length": 100, "bytesCompleted": 50},
+            {"name": "Show/E02.mkv", "length": 200, "bytesCompleted": 0},
+        ]
+        rpc.torrents[1]["priorities"] = [0, 1]
+        rpc.torrents[1]["wanted"] = [1, 1]
+        rpc.torrents[1]["fileStats"] = [
+            {"bytesCompleted": 80, "wanted": True, "priority": 0},
+            {"bytesCompleted": 0, "wanted": True, "priority": 1},
+        ]
+        base_call = rpc.__call__
+
+        async def call(method, arguments=None):
+            if method == "torrent-add":
+                rpc.calls.append((method, arguments or {}))
+                return {"torrent-duplicate": {"id": 1, "name": "Torrent 1", "hashString": "x"}}
+            return await base_call(method, arguments)
+
+        mocker.patch("joi_mcp.transmission._rpc", new=call)
+        return rpc
+
+    @pytest.mark.asyncio
+    async def test_add_torrent(self, rpc):
+        torrent = await tm.add_torrent("magnet:?xt=urn:btih:abc", download_dir="/data")
+        assert ("torrent-add", {"filename": "magnet:?xt=urn:btih:abc", "download-dir": "/data"}) in rpc.calls
+        assert (torrent.id, torrent.file_count) == (1, 1)
+        assert tm._mirror.dirty
+
+    @pytest.mark.asyncio
+    async def test_list_files(self, rpc):
+        result = await tm.list_files(1, depth=None)
+        assert [(f.name, f.priority) for f in result.files] == [("Show/E01.mkv", 0), ("Show/E02.mkv", 1)]
+        assert rpc.gets([1])[0]["fields"] == ["id", "hashString", "files", "priorities", "wanted"]
+
+    @pytest.mark.asyncio
+    async def test_list_files_reuses_tree(self, rpc, mocker):
+        now = [1000.0]
+        mocker.patch("joi_mcp.transmission.time.monotonic", side_effect=lambda: now[0])
+        await tm.list_files(1)
+        result = await tm.list_files(1, folder="Show")
+        assert [f.name for f in result.files] == ["Show/E01.mkv", "Show/E02.mkv"]
+        assert len(rpc.gets([1])) == 1
+        now[0] += 5
+        result = await tm.list_files(1)
+        assert rpc.gets([1])[-1]["fields"] == ["id", "hashString", "fileStats"]
+        assert result.files[0].completed_size == 80
+
+    @pytest.mark.asyncio
+    async def test_list_files_rebuilds_for_other_torrent(self, rpc):
+        await tm.list_files(1)
+        rpc.torrents[1]["hashString"] = "f" * 40
+        rpc.torrents[1]["files"][0]["name"] = "Other/E01.mkv"
+        await tm.set_file_priorities(1, file_indices=[0], priority=3)
+        result = await tm.list_files(1)
+        assert [f.name for f in result.files] == ["Other", "Show"]
+        assert [a["fields"][-1] for a in rpc.gets([1])] == ["wanted", "fileStats", "wanted"]
+
+    @pytest.mark.asyncio
+    async def test_list_files_unknown_torrent(self, rpc):
+        with pytest.raises(ValueError, match="Torrent 9 not found"):
+            await tm.list_files(9)
+
+
+@pytest.mark.unit
+class TestSetFilePriorities:
+    @pytest.fixture
+    def rpc(self, mocker):
+        rpc = FakeRpc(1, 2)
+        mocker.patch("joi_mcp.transmission._rpc", new=rpc)
+        return rpc
+
+    def test_priority_arguments(self):
+        assert _priority_arguments({3: [0, 1], 0: [4, 5], 1: [2]}) == {
+            "files-unwanted": [4, 5],
+            "files-wanted": [2, 0, 1],
+            "priority-low": [2],
+            "priority-high": [0, 1],
+        }
+
+    def test_empty_groups_dropped(self):
+        # an empty list would mean "all files" to Transmission
+        assert _priority_arguments({0: [], 2: [3]}) == {"files-wanted": [3], "priority-normal": [3]}
+
+    @pytest.mark.parametrize(
+        "groups,match",
+        [({4: [1]}, "Invalid priority 4"), ({0: [1, 2], 3: [2]}, r"File indices \[2\] given more than one priority")],
+    )
+    def test_invalid_groups(self, groups, match):
+        with pytest.raises(ValueError, match=match):
+            _priority_arguments(groups)
+
+    @pytest.mark.asyncio
+    async def test_single_group_is_one_rpc(self, rpc):
+        assert await tm.set_file_priorities(1, file_indices=[0, 1], priority=3)
+        assert rpc.calls == [("torrent-set", {"ids": [1], "files-wanted": [0, 1], "priority-high": [0, 1]})]
+
+    @pytest.mark.asyncio
+    async def test_batch_over_torrents_is_one_rpc(self, rpc):
+        await tm.set_file_priorities([1, 2], priorities={0: [5, 6], 3: [0, 1, 2]})
+        assert rpc.calls == [
+            ("torrent-set", {"ids": [1, 2], "files-unwanted": [5, 6], "files-wanted": [0, 1, 2], "priority-high": [0, 1, 2]})
+        ]
+
+    @pytest.mark.asyncio
+    async def test_single_group_merged_into_batch(self, rpc):
+        await tm.set_file_priorities(1, file_indices=[3], priority=0, priorities={0: [4]})
+        assert rpc.calls == [("torrent-set", {"ids": [1], "files-unwanted": [4, 3]})]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("kwargs", [{}, {"file_indices": [1]}, {"priorities": {2: []}}])
+    async def test_nothing_to_set(self, rpc, kwargs):
+        with pytest.raises(ValueError):
+            await tm.set_file_priorities(1, **kwargs)
+        assert rpc.calls == []
+
+
+def watched(id: int, **overrides: Any) -> Torrent:
+    values: dict[str, Any] = {
+        "id": id,
+        "name": f"Torrent {id}",
+        "status": "downloading",
+        "progress": 50.0,
+        "error_string": "",
+        "download_speed": 10,
+    }
+    return Torrent.model_construct(**values | overrides)
+
+
+@pytest.mark.unit
+class TestTorrentWatch:
+    def test_first_diff_is_baseline(self):
+        watch = tm.TorrentWatch()
+        assert watch.diff([watched(1)], 0.0) == []
+
+    def test_added_completed_errored(self):
+        watch = tm.TorrentWatch()
+        watch.diff([watched(1), watched(2)], 0.0)
+        events = watch.diff([watched(1, progress=100.0, status="seeding"), watched(2, error_string="Tracker gone"), watched(3)], 5.0)
+        assert [(e.type, e.torrent_id) for e in events] == [("completed", 1), ("errored", 2), ("added", 3)]
+        assert events[1].error_string == "Tracker gone"
+        assert watch.diff([watched(1, progress=100.0, status="seeding"), watched(2, error_string="x"), watched(3)], 10.0) == []
+
+    def test_stalled_once_until_moving_again(self, mocker):
+        mocker.patch.object(tm.settings, "transmission_stall_after", 60.0)
+        watch = tm.TorrentWatch()
+        watch.diff([watched(1, download_speed=0)], 0.0)
+        assert watch.diff([watched(1, download_speed=0)], 30.0) == []
+        assert [e.type for e in watch.diff([watched(1, download_speed=0)], 60.0)] == ["stalled"]
+        assert watch.diff([watched(1, download_speed=0)], 90.0) == []
+        watch.diff([watched(1)], 95.0)
+        assert watch.diff([watched(1, download_speed=0)], 100.0) == []
+        assert [e.type for e in watch.diff([watched(1, download_speed=0)], 160.0)] == ["stalled"]
+        watch.diff([], 165.0)
+        assert watch.idle_since == {} and watch.stalled == set()
+
+    def test_speed_threshold_crossings(self, mocker):
+        watch = tm.TorrentWatch()
+        watch.diff([watched(1, download_speed=10)], 0.0)
+        assert watch.diff([watched(1, download_speed=5000)], 1.0) == []
+        mocker.patch.object(tm.settings, "transmission_speed_threshold", 1000)
+        assert [e.download_speed for e in watch.diff([watched(1, download_speed=10)], 2.0)] == [10]
+        assert watch.diff([watched(1, download_speed=20)], 3.0) == []
+        assert [e.type for e in watch.diff([watched(1, download_speed=1000)], 4.0)] == ["speed"]
+
+    def test_slow_subscriber_drops_oldest(self, mocker):
+        mocker.patch.object(tm, "EVENT_QUEUE_SIZE", 2)
+        watch = tm.TorrentWatch()
+        queue = asyncio.Queue(maxsize=2)
+        watch._subscribers.append(queue)
+        for i in range(3):
+            watch.publish(tm.TorrentEvent(type="added", torrent_id=i, name="x", progress=0, download_speed=0, error_string=""))
+        assert [queue.get_nowait().torrent_id for _ in range(2)] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_torrent_events_stream(self, mocker):
+        rpc = FakeRpc(1)
+        mocker.patch("joi_mcp.transmission._rpc", new=rpc)
+        mocker.patch.object(tm.settings, "transmission_watch_interval", 0.01)
+        mocker.patch.object(tm.settings, "transmission_mirror_max_age", 0.0)
+        events = tm.torrent_events(heartbeat=0.01)
+        assert await anext(events) is None
+        rpc.torrents[1] |= {"percentDone": 1.0, "status": 6}
+        rpc.active = [rpc.torrents[1]]
+        event = None
+        for _ in range(20):
+            if (event := await anext(events)) is not None:
+                break
+        assert (event.type, event.torrent_id, event.progress) == ("completed", 1, 100.0)
+        assert set(rpc.requested()) >= {"name", "percentDone", "errorString", "rateDownload"}
+        await events.aclose()
+        assert tm._watch._subscribers == []
+        assert tm._watch._task is not None
+        await asyncio.wait_for(tm._watch._task, 1.0)
+
+    @pytest.mark.asyncio
+    async def test_watcher_survives_unexpected_error(self, mocker):
+        mocker.patch.object(tm, "_watch", tm.TorrentWatch())
+        mocker.patch.object(tm.settings, "transmission_watch_interval", 0.01)
+        ticks = [KeyError("torrents"), [watched(1)], [watched(1), watched(2)]]
+
+        async def sync(fields):
+            tick = ticks.pop(0) if len(ticks) > 1 else ticks[0]
+            if isinstance(tick, Exception):
+                raise tick
+            return tick
+
+        mocker.patch("joi_mcp.transmission._sync_torrents", new=sync)
+        events = tm.torrent_events(heartbeat=1.0)
+        event = await anext(events)
+        assert event is not None and (event.type, event.torrent_id) == ("added", 2)
+        await events.aclose()
+        assert tm._watch._task is not None
+        await asyncio.wait_for(tm._watch._task, 1.0)
+
+
+def _mock_transport(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url="http://transmission:9091", transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.unit
+class TestRpcClient:
+    @pytest.mark.asyncio
+    async def test_session_id_negotiated_once_and_reused(self):
+        seen: list[str | None] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request.headers.get(tm.SESSION_HEADER))
+            if request.headers.get(tm.SESSION_HEADER) != "abc":
+                return httpx.Response(409, headers={tm.SESSION_HEADER: "abc"})
+            return httpx.Response(200, json={"result": "success", "arguments": {"ok": True}})
+
+        tm._upstream.client = _mock_transport(handler)
+        assert await tm._rpc("session-get") == {"ok": True}
+        await tm._rpc("torrent-stop", {"ids": [1]})
+        assert seen == [None, "abc", "abc"]
+
+    @pytest.mark.asyncio
+    async def test_session_id_renegotiated_after_restart(self):
+        current = ["new"]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.headers.get(tm.SESSION_HEADER) != current[0]:
+                return httpx.Response(409, headers={tm.SESSION_HEADER: current[0]})
+            return httpx.Response(200, json={"result": "success", "arguments": {}})
+
+        tm._upstream.client = _mock_transport(handler)
+        tm._session_id = "stale"
+        await tm._rpc("session-get")
+        assert tm._session_id == "new"
+
+    @pytest.mark.asyncio
+    async def test_payload_and_error_result(self):
+        bodies = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            bodies.append(json.loads(request.content))
+            return httpx.Response(200, json={"result": "invalid or corrupt torrent file"})
+
+        tm._upstream.client = _mock_transport(handler)
+        with pytest.raises(TransmissionError, match="invalid or corrupt"):
+            await tm._rpc("torrent-add", {"filename": "http://x"})
+        assert bodies == [{"method": "torrent-add", "arguments": {"filename": "http://x"}}]
+
+    @pytest.mark.asyncio
+    async def test_list_does_not_block_pause(self):
+        async def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            if body["method"] == "torrent-get":
+                await asyncio.sleep(0.2)
+                return httpx.Response(200, json={"result": "success", "arguments": {"torrents": []}})
+            return httpx.Response(200, json={"result": "success", "arguments": {"rpc-version": 17}})
+
+        tm._upstream.client = _mock_transport(handler)
+        listing = asyncio.create_task(list_torrents())
+        await asyncio.sleep(0.05)
+        start = time.monotonic()
+        assert await tm.pause_torrent(1)
+        assert time.monotonic() - start < 0.1
+        assert (await listing).total == 0
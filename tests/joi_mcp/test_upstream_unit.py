@@ -0,0 +1,127 @@
+import asyncio
+
+import httpx
+import pytest
+
+import joi_mcp.upstream as up
+from joi_mcp.upstream import LatencyHistogram, Upstream, UpstreamUnavailableError, upstream_stats
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [1000.0]
+    mocker.patch("joi_mcp.upstream.time.monotonic", side_effect=lambda: now[0])
+    return now
+
+
+class FakeService:
+    """MockTransport handler answering every request with `status`; status 0 refuses the connection."""
+
+    def __init__(self):
+        self.status = 200
+        self.sent: list[str] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.sent.append(request.url.path)
+        if self.status == 0:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(self.status)
+
+
+@pytest.fixture
+def service():
+    return FakeService()
+
+
+@pytest.fixture
+def upstream(mocker, service):
+    mocker.patch.object(up.settings, "upstream_breaker_failures", 2)
+    mocker.patch.object(up.settings, "upstream_breaker_cooldown", 30.0)
+    upstream = Upstream("test", 2, base_url="http://svc")
+    upstream.client = httpx.AsyncClient(base_url="http://svc", transport=httpx.MockTransport(service))
+    yield upstream
+    up._registry.pop("test")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestCircuitBreaker:
+    async def test_opens_after_consecutive_failures_and_fails_fast(self, service, upstream, clock):
+        service.status = 0
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await upstream.request("GET", "/a")
+        with pytest.raises(UpstreamUnavailableError, match="test is unavailable after 2 consecutive failures; retrying in 30s"):
+            await upstream.request("GET", "/b")
+        assert service.sent == ["/a", "/a"]
+        assert (upstream.stats.failures, upstream.stats.rejected, upstream.stats.trips) == (2, 1, 1)
+
+    async def test_half_open_probe_closes_on_success(self, service, upstream, clock):
+        service.status = 503
+        for _ in range(2):
+            assert (await upstream.request("GET", "/a")).status_code == 503
+        clock[0] += 30
+        assert upstream_stats()["test"].state == "half_open"
+        service.status = 200
+        assert (await upstream.request("GET", "/probe")).status_code == 200
+        assert upstream.breaker.state(clock[0]) == "closed"
+        await upstream.request("GET", "/c")
+        assert service.sent[-2:] == ["/probe", "/c"]
+
+    async def test_failed_probe_reopens(self, service, upstream, clock):
+        service.status = 0
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await upstream.request("GET", "/a")
+        clock[0] += 30
+        with pytest.raises(httpx.ConnectError):
+            await upstream.request("GET", "/probe")
+        with pytest.raises(UpstreamUnavailableError):
+            await upstream.request("GET", "/b")
+        assert upstream.breaker.trips == 1
+
+    async def test_only_one_probe_in_half_open(self, upstream, clock):
+        upstream.breaker.opened_at = clock[0] - 30
+        upstream.breaker.probing = True
+        with pytest.raises(UpstreamUnavailableError):
+            await upstream.request("GET", "/b")
+
+    async def test_cancelled_probe_releases_half_open(self, upstream, clock, mocker):
+        upstream.breaker.opened_at = clock[0] - 30
+
+        async def hang(*args, **kwargs):
+            await asyncio.Event().wait()
+
+        mocker.patch.object(upstream.client, "send", new=hang)
+        task = asyncio.create_task(upstream.request("GET", "/probe"))
+        await asyncio.sleep(0)
+        assert upstream.breaker.probing
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not upstream.breaker.probing
+
+    async def test_application_errors_keep_breaker_closed(self, service, upstream, clock):
+        for status in (500, 404, 429, 500):
+            service.status = status
+            await upstream.request("GET", "/a")
+        assert upstream.breaker.state(clock[0]) == "closed"
+        assert upstream.stats.failures == 0
+
+
+@pytest.mark.unit
+class TestLatencyHistogram:
+    def test_quantiles_are_bucket_bounds(self):
+        histogram = LatencyHistogram()
+        assert histogram.p50 is None
+        for seconds in (0.01, 0.02, 0.2, 0.3, 40.0):
+            histogram.observe(seconds)
+        assert histogram.counts[0] == 2
+        assert histogram.counts[-1] == 1
+        assert (histogram.p50, histogram.p95) == (0.25, float("inf"))
+        assert histogram.model_dump()["count"] == 5
+
+    @pytest.mark.asyncio
+    async def test_requests_observed(self, upstream):
+        await upstream.request("GET", "/a")
+        assert upstream_stats()["test"].latency.count == 1